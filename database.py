@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
+import os
 import sqlite3
+import threading
 import mysql.connector
+import psycopg2
+from psycopg2 import pool
 import logging
 
 
@@ -15,6 +19,13 @@ class BDFactory(ABC):
         """
         pass
 
+    def release(self, connection):
+        """
+        Метод освобождения подключения к базе данных
+        :param connection: Подключение, полученное методом connect
+        """
+        connection.close()
+
 
 class SQLiteFactory(BDFactory):
     """
@@ -42,31 +53,105 @@ class MySQLFactory(BDFactory):
 
 class PostgresSQLFactory(BDFactory):
     """
-    Реализация конкретной фабрики для PostgresSql
+    Реализация конкретной фабрики для PostgresSql.
+    Подключения берутся из пула и возвращаются в него методом release,
+    параметры подключения по умолчанию читаются из переменных окружения BPLA_PG_*
     """
+    def __init__(self, host=None, port=None, user=None, password=None, database=None,
+                 min_connections=1, max_connections=10, connect_timeout=30.0):
+        """
+        Конструктор класса PostgresSQLFactory
+        :param host: Адрес сервера PostgresSql
+        :param port: Порт сервера PostgresSql
+        :param user: Имя пользователя
+        :param password: Пароль пользователя
+        :param database: Наименование базы данных
+        :param min_connections: Минимальное количество подключений в пуле
+        :param max_connections: Максимальное количество подключений в пуле
+        :param connect_timeout: Время ожидания свободного подключения из пула, в секундах
+        """
+        self._params = {
+            'host': host or os.environ.get('BPLA_PG_HOST', '127.0.0.1'),
+            'port': port or int(os.environ.get('BPLA_PG_PORT', 5432)),
+            'user': user or os.environ.get('BPLA_PG_USER', 'postgres'),
+            'password': password or os.environ.get('BPLA_PG_PASSWORD', ''),
+            'dbname': database or os.environ.get('BPLA_PG_DATABASE', 'bpla')
+        }
+        self._min_connections = min_connections
+        self._max_connections = max_connections
+        self._connect_timeout = connect_timeout
+        self._available = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._pool = None
+
     def connect(self):
         """
-        Метод подключения к PostgresSql
+        Метод подключения к PostgresSql. Если все подключения пула заняты,
+        метод ожидает освобождения подключения не дольше connect_timeout
+        :return: Подключение из пула
+        """
+        logging.info('Запуск метода connect для PostgresSQLFactory')
+        if not self._available.acquire(timeout=self._connect_timeout):
+            raise pool.PoolError('Нет свободных подключений к PostgresSql')
+        try:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pool.ThreadedConnectionPool(self._min_connections, self._max_connections,
+                                                             **self._params)
+            return self._pool.getconn()
+        except Exception:
+            self._available.release()
+            raise
+
+    def release(self, connection):
+        """
+        Метод возврата подключения в пул. Незавершенная транзакция откатывается,
+        подключение, которое не удалось откатить (например, разорванное сервером), закрывается
+        :param connection: Подключение, полученное методом connect
+        """
+        logging.info('Запуск метода release для PostgresSQLFactory')
+        try:
+            broken = bool(connection.closed)
+            if not broken:
+                try:
+                    connection.rollback()
+                except psycopg2.Error as e:
+                    logging.warning(f'Подключение к PostgresSql закрывается: {e}')
+                    broken = True
+            self._pool.putconn(connection, close=broken)
+        finally:
+            self._available.release()
+
+    def close_all(self):
         """
-        pass
+        Метод закрытия всех подключений пула
+        """
+        logging.info('Запуск метода close_all для PostgresSQLFactory')
+        if self._pool is not None:
+            self._pool.closeall()
+            self._pool = None
 
 
 class QueryBuilder:
     """
     Класс для создания SQL-запросов
     """
-    def __init__(self):
+    def __init__(self, placeholder='?'):
         """
         Конструктор класса QueryBuilder
+        :param placeholder: Обозначение параметра в запросе ('?' для SQLite, '%s' для MySql и PostgresSql)
         """
         self._query = {
             'select': '',
             'where': '',
             'order_by': '',
             'insert_into': None,
-            'values': None
+            'values': None,
+            'update': None,
+            'delete': None
         }
         self._params = []
+        self._placeholder = placeholder
 
     def select(self, table, columns='*'):
         """
@@ -137,11 +222,33 @@ class QueryBuilder:
         """
         logging.info('Запуск метода insert_into для QueryBuilder')
         cols = ','.join(columns)
-        placeholders = ','.join(['?'] * len(columns))
+        placeholders = ','.join([self._placeholder] * len(columns))
         self._query['insert_into'] = f'INSERT INTO {table} ({cols})'
         self._query['values'] = f'VALUES ({placeholders})'
         return self
 
+    def update(self, table, columns):
+        """
+        Метод создания части запроса для обновления данных в базе данных
+        :param table: Наименование таблицы, в которой обновляются данные
+        :param columns: Столбцы, которые обновляются
+        :return: Экземляр класса QueryBuilder
+        """
+        logging.info('Запуск метода update для QueryBuilder')
+        assignments = ','.join([f'{column} = {self._placeholder}' for column in columns])
+        self._query['update'] = f'UPDATE {table} SET {assignments}'
+        return self
+
+    def delete(self, table):
+        """
+        Метод создания части запроса для удаления данных из базы данных
+        :param table: Наименование таблицы, из которой удаляются данные
+        :return: Экземляр класса QueryBuilder
+        """
+        logging.info('Запуск метода delete для QueryBuilder')
+        self._query['delete'] = f'DELETE FROM {table}'
+        return self
+
     def get_query(self):
         """
         Метод создания итогового запроса
@@ -157,6 +264,14 @@ class QueryBuilder:
             query += f'\n{self._query["order_by"]}'
         if self._query['insert_into']:
             query = f'{self._query['insert_into']} {self._query['values']}'
+        if self._query['update']:
+            query = f'{self._query["update"]}'
+            if self._query['where']:
+                query += f'\n{self._query["where"]}'
+        if self._query['delete']:
+            query = f'{self._query["delete"]}'
+            if self._query['where']:
+                query += f'\n{self._query["where"]}'
         return query
 
 
@@ -188,5 +303,5 @@ class DBConnectionManager:
         """
         logging.info('Запуск метода close_connection для DBConnectionManager')
         if self._connection:
-            self._connection.close()
+            self._bd.release(self._connection)
             self._connection = None
@@ -1,41 +1,108 @@
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import wait
 import logging
+import threading
+from transport import *
 
 
 PATH = 'templates/mission.html'
+# Максимальное время ожидания подтверждения команд миссии, в секундах
+MISSION_TIMEOUT = 30.0
+# Количество последних неуспешных команд, которые контроллер хранит до вызова flush
+FAILURES_LIMIT = 1000
 
 
 class DroneController:
     """
     Класс для управления дроном
     """
+    def __init__(self, transport: IDroneTransport = None, drone_id: int = 0):
+        """
+        Конструктор класса DroneController
+        :param transport: Транспорт для отправки команд дрону (без транспорта команды только выводятся на страницу)
+        :param drone_id: id дрона, которому отправляются команды
+        """
+        self.__transport = transport
+        self.__drone_id = drone_id
+        self.__pending = set()
+        self.__failures = deque(maxlen=FAILURES_LIMIT)
+        self.__lock = threading.Lock()
+
+    def _dispatch(self, opcode: int, argument: float = 0.0):
+        """
+        Метод отправки команды дрону через транспорт без ожидания подтверждения
+        :param opcode: Код команды
+        :param argument: Аргумент команды
+        :return: Future подтверждения команды или None, если транспорт не задан
+        """
+        if self.__transport is None:
+            return None
+        future = self.__transport.send(self.__drone_id, opcode, argument)
+        with self.__lock:
+            self.__pending.add(future)
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future):
+        """
+        Метод обработки завершения команды: подтвержденные команды не накапливаются,
+        неуспешные сохраняются (не более FAILURES_LIMIT последних) до вызова flush
+        :param future: Future подтверждения команды
+        """
+        with self.__lock:
+            self.__pending.discard(future)
+            if future.exception() is not None:
+                self.__failures.append(future)
+
+    def flush(self, timeout: float = None):
+        """
+        Метод ожидания подтверждения всех отправленных команд
+        :param timeout: Максимальное время ожидания в секундах
+        :return: Список завершившихся ошибкой с прошлого вызова flush и еще не подтвержденных команд (Future)
+        """
+        logging.info('Запуск метода flush для DroneController')
+        with self.__lock:
+            pending = list(self.__pending)
+        wait(pending, timeout)
+        with self.__lock:
+            failures = list(self.__failures) + list(self.__pending)
+            self.__failures.clear()
+        return failures
+
     def takeoff(self):
         """
         Метод для взлета дрона
+        :return: Future подтверждения команды или None, если транспорт не задан
         """
         logging.info('Запуск метода takeoff для DroneController')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Дрон взлетает...</p>')
+        return self._dispatch(OPCODE_TAKEOFF)
 
     def move_forward(self, distance: float):
         """
         Метод для движения вперед на заданное расстояние.
         :param distance: Расстояние, на которое дрон должен пролететь вперед
+        :return: Future подтверждения команды или None, если транспорт не задан
         """
         logging.info('Запуск метода move_forward для DroneController')
         # logging.info(f'Летим вперед на {distance} метров')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Летим вперед на {{ distance }} метров</p>')
+        return self._dispatch(OPCODE_MOVE_FORWARD, distance)
 
     def turn(self, degree: float):
         """
         Команда для поворота дрона на заданное количество градусов
         :param degree: Угол поворота в градусах
+        :return: Future подтверждения команды или None, если транспорт не задан
         """
         logging.info('Запуск метода turn для DroneController')
         # logging.info(f'Поворачиваем на {degree} градусов')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Поворачиваем на {{ degree }} градусов</p>')
+        return self._dispatch(OPCODE_TURN, degree)
 
 
 class ICommand(ABC):
@@ -72,7 +139,7 @@ class Takeoff(ICommand):
         Метод выполнения команды взлета
         """
         logging.info('Запуск метода execute для команды Takeoff')
-        self.__drone.takeoff()
+        return self.__drone.takeoff()
 
 
 class MoveForward(ICommand):
@@ -93,7 +160,7 @@ class MoveForward(ICommand):
         Метод выполнения движения дрона вперёд на заданное направление
         """
         logging.info('Запуск метода execute для команды MoveForward')
-        self.__drone.move_forward(self.__distance)
+        return self.__drone.move_forward(self.__distance)
 
 
 class Turn(ICommand):
@@ -114,7 +181,7 @@ class Turn(ICommand):
         Метод выполнения команды поворота дрона на заданный угол
         """
         logging.info('Запуск метода execute для команды Turn')
-        self.__drone.turn(self.__degree)
+        return self.__drone.turn(self.__degree)
 
 
 class IFlightStrategy(ABC):
@@ -126,9 +193,26 @@ class IFlightStrategy(ABC):
         """
         Метод для выполнения списка команд в рамках стратегии.
         :param commands: Список команд для выполнения.
+        :return: Список команд (Future), не подтвержденных дроном
         """
         pass
 
+    def wait_commands(self, futures: list, timeout: float = MISSION_TIMEOUT):
+        """
+        Метод ожидания подтверждения отправленных команд и вывода ошибок на страницу миссии
+        :param futures: Результаты выполнения команд (Future или None для команд без транспорта)
+        :param timeout: Максимальное время ожидания в секундах
+        :return: Список команд (Future), не подтвержденных дроном
+        """
+        done, not_done = wait([future for future in futures if future is not None], timeout)
+        failures = [future for future in done if future.exception() is not None] + list(not_done)
+        for future in failures:
+            error = future.exception() if future.done() else 'нет ответа от дрона'
+            logging.warning(f'Команда не выполнена: {error}')
+            with open(PATH, 'a', encoding='utf-8') as func:
+                func.write(f'\n<p>Команда не выполнена: {error}</p>')
+        return failures
+
 
 class ReconMissionStrategy(IFlightStrategy):
     """
@@ -138,17 +222,17 @@ class ReconMissionStrategy(IFlightStrategy):
         """
         Метод выполнения разведывательной миссии
         :param commands: Список команд
-        :return: Симуляции выполнения миссии
+        :return: Список команд (Future), не подтвержденных дроном
         """
         logging.info('Запуск метода execute для миссии ReconMissionStrategy')
         logging.info('Начало выполнения разведовательной миссии')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Начало выполнения разведовательной миссии</p>')
-        for command in commands:
-            command.execute()
+        failures = self.wait_commands([command.execute() for command in commands])
         logging.info('Окончание выполнения разведовательной миссии')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Окончание выполнения разведовательной миссии</p>')
+        return failures
 
 
 class PatrolMissionStrategy(IFlightStrategy):
@@ -166,19 +250,22 @@ class PatrolMissionStrategy(IFlightStrategy):
         """
         Метод выполнения миссии патрулироваиния
         :param commands: Список команд
-        :return: Симуляции выполнения миссии
+        :return: Список команд (Future), не подтвержденных дроном
         """
         logging.info('Запуск метода execute для миссии PatrolMissionStrategy')
         logging.info('Начало выполнения миссии патрулирования')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Начало выполнения миссии патрулирования</p>')
+        futures = []
         for _ in range(self.__n_patrols):
             for command in commands:
-                command.execute()
+                futures.append(command.execute())
             # logging.info('Патрулирование выполнено')
+        failures = self.wait_commands(futures)
         logging.info('Окончание выполнения разведовательной миссии')
         with open(PATH, 'a', encoding='utf-8') as func:
             func.write('\n<p>Конец выполнения разведовательной миссии</p>')
+        return failures
 
     def turn(self, degree: float):
         logging.info('Запуск метода turn для миссии PatrolMissionStrategy')
@@ -219,7 +306,9 @@ class DroneContext:
         """
         Выполняет все команды, используя текущую стратегию полета.
         После выполнения команды очищает список.
+        :return: Список команд (Future), не подтвержденных дроном
         """
         logging.info('Запуск метода execute для DroneContext')
-        self.__strategy.execute(self.__commands)
+        failures = self.__strategy.execute(self.__commands)
         self.__commands.clear()
+        return failures
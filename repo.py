@@ -1,5 +1,15 @@
+from contextlib import closing
+import csv
+import io
+import time
 from database import *
 from model import *
+from snapshot import write_snapshot
+
+
+DRONE_COLUMNS = ['max_altitude', 'max_speed', 'max_flight_time', 'serial_number', 'model', 'manufacturer']
+# Журнал изменений и удалений дронов: по нему индекс поиска догружает изменения, сделанные после выгрузки снимка
+CHANGES_COLUMNS = ['drone_id', 'changed_at']
 
 
 class IDroneRepository(ABC):
@@ -40,13 +50,42 @@ class IDroneRepository(ABC):
         pass
 
     @abstractmethod
-    def update_drone(self, drone_id: int):
+    def update_drone(self, drone_id: int, drone: Drone):
         """
         Абстрактный метод обновления данных дрона
         :param drone_id: Id дрона для обновления данных
+        :param drone: Экземпляр класса Drone с новыми данными
         """
         pass
 
+    def get_drones_after(self, drone_id: int):
+        """
+        Метод получения дронов с id больше заданного (догрузка изменений после снимка)
+        :param drone_id: id, после которого нужны дроны
+        :return: Список записей о дронах
+        """
+        return [row for row in self.get_all_drones() if row[0] > drone_id]
+
+    def get_changes_since(self, timestamp: float):
+        """
+        Метод получения дронов, измененных или удаленных начиная с заданного времени
+        (догрузка изменений уже выгруженных в снимок дронов)
+        :param timestamp: Время (unix), начиная с которого нужны изменения
+        :return: Словарь {id дрона: текущая запись или None, если дрон удален},
+                 None - репозиторий не ведет журнал изменений
+        """
+        return None
+
+    def export_snapshot(self, path: str):
+        """
+        Метод выгрузки всех дронов репозитория в бинарный снимок (см. snapshot.py)
+        :param path: Путь к файлу снимка
+        :return: Количество выгруженных дронов
+        """
+        logging.info('Запуск метода export_snapshot')
+        exported_at = time.time()
+        return write_snapshot(path, sorted(self.get_all_drones()), exported_at)
+
 
 class MySqlDroneRepository(IDroneRepository):
     """
@@ -84,7 +123,7 @@ class MySqlDroneRepository(IDroneRepository):
     def remove_drone(self, drone_id: int):
         pass
 
-    def update_drone(self, drone_id: int):
+    def update_drone(self, drone_id: int, drone: Drone):
         pass
 
 
@@ -119,6 +158,7 @@ class SqliteDroneRepository(IDroneRepository):
         """
         Метод добавления конкретного дрона в базу данных
         :param drone: Объект, реализующий класс Drone
+        :return: id добавленного дрона
         """
         logging.info('Запуск метода add_drone для SqLite')
         connect_manager = DBConnectionManager(self.sqlite_bd)
@@ -135,6 +175,7 @@ class SqliteDroneRepository(IDroneRepository):
             cur_cursor.execute(insert_query, params)
             connect.commit()
             connect_manager.close_connection()
+            return cur_cursor.lastrowid
         except Exception as e:
             print(f'Ошибка! Незвозможно добавить запись: {e}')
 
@@ -154,8 +195,417 @@ class SqliteDroneRepository(IDroneRepository):
         connect_management.close_connection()
         return result
 
+    def get_drones_after(self, drone_id: int):
+        """
+        Метод получения дронов с id больше заданного
+        :param drone_id: id, после которого нужны дроны
+        :return: Список записей о дронах
+        """
+        logging.info('Запуск метода get_drones_after для SqLite')
+        connect_manager = DBConnectionManager(self.sqlite_bd)
+        connect = connect_manager.get_connection()
+        cur_cursor = connect.cursor()
+        query_builder = QueryBuilder()
+        query = query_builder.select('tbl_drones').where('id > ?').add_params(int(drone_id)).order_by('id').get_query()
+        cur_cursor.execute(query, query_builder.get_params())
+        result = cur_cursor.fetchall()
+        connect_manager.close_connection()
+        return result
+
     def remove_drone(self, drone_id: int):
-        pass
+        """
+        Метод удаления дрона из базы данных
+        :param drone_id: id дрона для удаления
+        :return: True, если дрон был удален
+        """
+        logging.info('Запуск метода remove_drone для SqLite')
+        connect_manager = DBConnectionManager(self.sqlite_bd)
+        connect = connect_manager.get_connection()
+        cur_cursor = connect.cursor()
+        query_builder = QueryBuilder()
+        query = query_builder.delete('tbl_drones').where('id = ?').add_params(int(drone_id)).get_query()
+        cur_cursor.execute(query, query_builder.get_params())
+        removed = cur_cursor.rowcount > 0
+        if removed:
+            self._record_change(cur_cursor, drone_id)
+        connect.commit()
+        connect_manager.close_connection()
+        return removed
 
-    def update_drone(self, drone_id: int):
-        pass
+    def update_drone(self, drone_id: int, drone: Drone):
+        """
+        Метод обновления данных дрона в базе данных
+        :param drone_id: id дрона для обновления данных
+        :param drone: Объект, реализующий класс Drone, с новыми данными
+        :return: True, если дрон был обновлен
+        """
+        logging.info('Запуск метода update_drone для SqLite')
+        connect_manager = DBConnectionManager(self.sqlite_bd)
+        connect = connect_manager.get_connection()
+        cur_cursor = connect.cursor()
+        try:
+            query_builder = QueryBuilder()
+            query = query_builder.update('tbl_drones', DRONE_COLUMNS).where('id = ?').values(
+                drone.max_altitude, drone.max_speed, drone.max_flight_time, drone.serial_number, drone.model,
+                drone.manufacturer).add_params(int(drone_id)).get_query()
+            cur_cursor.execute(query, query_builder.get_params())
+            updated = cur_cursor.rowcount > 0
+            if updated:
+                self._record_change(cur_cursor, drone_id)
+            connect.commit()
+            return updated
+        except Exception as e:
+            print(f'Ошибка! Незвозможно обновить запись: {e}')
+            return False
+        finally:
+            connect_manager.close_connection()
+
+    def _create_changes_table(self, cur_cursor):
+        """
+        Метод создания журнала изменений дронов, если он еще не существует
+        :param cur_cursor: Курсор подключения к базе данных
+        """
+        cur_cursor.execute("""CREATE TABLE IF NOT EXISTS tbl_drone_changes (
+                              drone_id INTEGER NOT NULL,
+                              changed_at REAL NOT NULL)""")
+        cur_cursor.execute('CREATE INDEX IF NOT EXISTS idx_drone_changes_at ON tbl_drone_changes (changed_at)')
+
+    def _record_change(self, cur_cursor, drone_id: int):
+        """
+        Метод записи изменения дрона в журнал в той же транзакции, что и само изменение
+        :param cur_cursor: Курсор подключения к базе данных
+        :param drone_id: id измененного или удаленного дрона
+        """
+        self._create_changes_table(cur_cursor)
+        query_builder = QueryBuilder()
+        query = query_builder.insert_into('tbl_drone_changes', CHANGES_COLUMNS).values(
+            int(drone_id), time.time()).get_query()
+        cur_cursor.execute(query, query_builder.get_params())
+
+    def get_changes_since(self, timestamp: float):
+        """
+        Метод получения дронов, измененных или удаленных начиная с заданного времени
+        :param timestamp: Время (unix), начиная с которого нужны изменения
+        :return: Словарь {id дрона: текущая запись или None, если дрон удален}
+        """
+        logging.info('Запуск метода get_changes_since для SqLite')
+        connect_manager = DBConnectionManager(self.sqlite_bd)
+        connect = connect_manager.get_connection()
+        cur_cursor = connect.cursor()
+        try:
+            self._create_changes_table(cur_cursor)
+            connect.commit()
+            query_builder = QueryBuilder()
+            query = query_builder.select('tbl_drone_changes', 'DISTINCT drone_id').where(
+                'changed_at >= ?').add_params(timestamp).get_query()
+            cur_cursor.execute(query, query_builder.get_params())
+            changes = {row[0]: None for row in cur_cursor.fetchall()}
+            query_builder = QueryBuilder()
+            query = query_builder.select('tbl_drones').where(
+                'id IN (SELECT drone_id FROM tbl_drone_changes WHERE changed_at >= ?)').add_params(
+                timestamp).get_query()
+            cur_cursor.execute(query, query_builder.get_params())
+            changes.update((row[0], row) for row in cur_cursor.fetchall())
+            return changes
+        finally:
+            connect_manager.close_connection()
+
+
+class _DroneCopyStream(io.RawIOBase):
+    """
+    Файлоподобный объект для COPY FROM STDIN: строки CSV формируются из дронов
+    по мере чтения, без загрузки всего манифеста в память
+    """
+    def __init__(self, drones):
+        """
+        Конструктор класса _DroneCopyStream
+        :param drones: Итерируемый объект с экземплярами класса Drone
+        """
+        self._drones = iter(drones)
+        self._buffer = b''
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line, lineterminator='\n')
+
+    def readable(self):
+        return True
+
+    def _next_line(self):
+        """
+        Метод формирования следующей строки CSV
+        :return: Строка CSV в байтах или пустая строка по окончании дронов
+        """
+        drone = next(self._drones, None)
+        if drone is None:
+            return b''
+        self._line.seek(0)
+        self._line.truncate()
+        self._writer.writerow([drone.max_altitude, drone.max_speed, drone.max_flight_time,
+                               drone.serial_number, drone.model, drone.manufacturer])
+        return self._line.getvalue().encode('utf-8')
+
+    def read(self, size=-1):
+        """
+        Метод чтения очередной порции данных для COPY
+        :param size: Размер порции в байтах
+        :return: Порция данных в байтах
+        """
+        while size < 0 or len(self._buffer) < size:
+            line = self._next_line()
+            if not line:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+class PostgresDroneRepository(IDroneRepository):
+    """
+    Реализация репозитория через базу данных PostgresSql
+    """
+    def __init__(self, factory: PostgresSQLFactory = None):
+        """
+        Объект, реализующий класс PostgresDroneRepository
+        :param factory: Фабрика подключений к PostgresSql (пул подключений общий для всех запросов репозитория)
+        """
+        self._drones = {}
+        self.postgres_bd = factory or PostgresSQLFactory()
+
+    def create_table(self):
+        """
+        Метод создания таблицы дронов, если она еще не существует
+        """
+        logging.info('Запуск метода create_table для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                cur_cursor.execute("""CREATE TABLE IF NOT EXISTS tbl_drones (
+                                      id BIGSERIAL PRIMARY KEY,
+                                      max_altitude INTEGER NOT NULL,
+                                      max_speed INTEGER NOT NULL,
+                                      max_flight_time INTEGER NOT NULL,
+                                      serial_number TEXT NOT NULL UNIQUE,
+                                      model TEXT NOT NULL,
+                                      manufacturer TEXT NOT NULL)""")
+                cur_cursor.execute("""CREATE TABLE IF NOT EXISTS tbl_drone_changes (
+                                      drone_id BIGINT NOT NULL,
+                                      changed_at DOUBLE PRECISION NOT NULL)""")
+                cur_cursor.execute('CREATE INDEX IF NOT EXISTS idx_drone_changes_at '
+                                   'ON tbl_drone_changes (changed_at)')
+            connect.commit()
+        finally:
+            connect_manager.close_connection()
+
+    def get_all_drones(self):
+        """
+        Метод получения списока всех дронов из базы данных
+        :return: Список всех дронов
+        """
+        logging.info('Запуск метода get_all_drones для PostgresSql')
+        with closing(self.iter_drones()) as rows:
+            return list(rows)
+
+    def iter_drones(self, batch_size: int = 10000):
+        """
+        Метод потокового получения дронов из базы данных через серверный курсор.
+        Строки передаются с сервера порциями, поэтому большой список не загружается в память целиком.
+        Подключение занято до окончания перебора, поэтому генератор, который может быть
+        прочитан не полностью, следует закрывать (например, через contextlib.closing)
+        :param batch_size: Количество строк, получаемых с сервера за один запрос
+        :return: Генератор записей о дронах
+        """
+        logging.info('Запуск метода iter_drones для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor(name='bpla_iter_drones') as cur_cursor:
+                cur_cursor.itersize = batch_size
+                query_builder = QueryBuilder('%s')
+                query = query_builder.select('tbl_drones').order_by('id').get_query()
+                cur_cursor.execute(query)
+                for row in cur_cursor:
+                    yield row
+        finally:
+            connect_manager.close_connection()
+
+    def export_snapshot(self, path: str):
+        """
+        Метод выгрузки всех дронов в бинарный снимок через серверный курсор
+        :param path: Путь к файлу снимка
+        :return: Количество выгруженных дронов
+        """
+        logging.info('Запуск метода export_snapshot для PostgresSql')
+        exported_at = time.time()
+        with closing(self.iter_drones()) as rows:
+            return write_snapshot(path, rows, exported_at)
+
+    def get_drones_after(self, drone_id: int):
+        """
+        Метод получения дронов с id больше заданного
+        :param drone_id: id, после которого нужны дроны
+        :return: Список записей о дронах
+        """
+        logging.info('Запуск метода get_drones_after для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query_builder = QueryBuilder('%s')
+                query = query_builder.select('tbl_drones').where('id > %s').add_params(int(drone_id)).order_by(
+                    'id').get_query()
+                cur_cursor.execute(query, query_builder.get_params())
+                return cur_cursor.fetchall()
+        finally:
+            connect_manager.close_connection()
+
+    def get_drone_by_id(self, drone_id: int):
+        """
+        Метод получения конктретного дрона из базы данных
+        :param drone_id: id дрона, получаемого из базы данных
+        :return: Список с найденной записью о дроне
+        """
+        logging.info('Запуск метода get_drone_by_id для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query_builder = QueryBuilder('%s')
+                query = query_builder.select('tbl_drones').where('id = %s').add_params(int(drone_id)).get_query()
+                cur_cursor.execute(query, query_builder.get_params())
+                return cur_cursor.fetchall()
+        finally:
+            connect_manager.close_connection()
+
+    def add_drone(self, drone: Drone):
+        """
+        Метод добавления конкретного дрона в базу данных
+        :param drone: Объект, реализующий класс Drone
+        :return: id добавленного дрона
+        """
+        logging.info('Запуск метода add_drone для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query_builder = QueryBuilder('%s')
+                insert_query = query_builder.insert_into('tbl_drones', DRONE_COLUMNS).values(
+                    drone.max_altitude, drone.max_speed, drone.max_flight_time, drone.serial_number, drone.model,
+                    drone.manufacturer).get_query()
+                cur_cursor.execute(insert_query + ' RETURNING id', query_builder.get_params())
+                drone_id = cur_cursor.fetchone()[0]
+            connect.commit()
+            return drone_id
+        except psycopg2.Error as e:
+            print(f'Ошибка! Незвозможно добавить запись: {e}')
+        finally:
+            connect_manager.close_connection()
+
+    def remove_drone(self, drone_id: int):
+        """
+        Метод удаления дрона из базы данных
+        :param drone_id: id дрона для удаления
+        :return: True, если дрон был удален
+        """
+        logging.info('Запуск метода remove_drone для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query_builder = QueryBuilder('%s')
+                query = query_builder.delete('tbl_drones').where('id = %s').add_params(int(drone_id)).get_query()
+                cur_cursor.execute(query, query_builder.get_params())
+                removed = cur_cursor.rowcount > 0
+                if removed:
+                    self._record_change(cur_cursor, drone_id)
+            connect.commit()
+            return removed
+        finally:
+            connect_manager.close_connection()
+
+    def update_drone(self, drone_id: int, drone: Drone):
+        """
+        Метод обновления данных дрона в базе данных
+        :param drone_id: id дрона для обновления данных
+        :param drone: Объект, реализующий класс Drone, с новыми данными
+        :return: True, если дрон был обновлен
+        """
+        logging.info('Запуск метода update_drone для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query_builder = QueryBuilder('%s')
+                query = query_builder.update('tbl_drones', DRONE_COLUMNS).where('id = %s').values(
+                    drone.max_altitude, drone.max_speed, drone.max_flight_time, drone.serial_number, drone.model,
+                    drone.manufacturer).add_params(int(drone_id)).get_query()
+                cur_cursor.execute(query, query_builder.get_params())
+                updated = cur_cursor.rowcount > 0
+                if updated:
+                    self._record_change(cur_cursor, drone_id)
+            connect.commit()
+            return updated
+        except psycopg2.Error as e:
+            print(f'Ошибка! Незвозможно обновить запись: {e}')
+            return False
+        finally:
+            connect_manager.close_connection()
+
+    def _record_change(self, cur_cursor, drone_id: int):
+        """
+        Метод записи изменения дрона в журнал в той же транзакции, что и само изменение
+        :param cur_cursor: Курсор подключения к базе данных
+        :param drone_id: id измененного или удаленного дрона
+        """
+        query_builder = QueryBuilder('%s')
+        query = query_builder.insert_into('tbl_drone_changes', CHANGES_COLUMNS).values(
+            int(drone_id), time.time()).get_query()
+        cur_cursor.execute(query, query_builder.get_params())
+
+    def get_changes_since(self, timestamp: float):
+        """
+        Метод получения дронов, измененных или удаленных начиная с заданного времени
+        :param timestamp: Время (unix), начиная с которого нужны изменения
+        :return: Словарь {id дрона: текущая запись или None, если дрон удален}
+        """
+        logging.info('Запуск метода get_changes_since для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query_builder = QueryBuilder('%s')
+                query = query_builder.select('tbl_drone_changes', 'DISTINCT drone_id').where(
+                    'changed_at >= %s').add_params(timestamp).get_query()
+                cur_cursor.execute(query, query_builder.get_params())
+                changes = {row[0]: None for row in cur_cursor.fetchall()}
+                query_builder = QueryBuilder('%s')
+                query = query_builder.select('tbl_drones').where(
+                    'id IN (SELECT drone_id FROM tbl_drone_changes WHERE changed_at >= %s)').add_params(
+                    timestamp).get_query()
+                cur_cursor.execute(query, query_builder.get_params())
+                changes.update((row[0], row) for row in cur_cursor.fetchall())
+            return changes
+        finally:
+            connect_manager.close_connection()
+
+    def bulk_load(self, drones):
+        """
+        Метод массовой загрузки манифеста парка дронов через COPY FROM STDIN.
+        Загрузка выполняется одной транзакцией: при ошибке не добавляется ни одна запись
+        :param drones: Итерируемый объект с экземплярами класса Drone
+        :return: Количество загруженных дронов
+        """
+        logging.info('Запуск метода bulk_load для PostgresSql')
+        connect_manager = DBConnectionManager(self.postgres_bd)
+        connect = connect_manager.get_connection()
+        try:
+            with connect.cursor() as cur_cursor:
+                query = (f'COPY tbl_drones ({",".join(DRONE_COLUMNS)}) FROM STDIN '
+                         'WITH (FORMAT csv, FORCE_NOT_NULL (serial_number, model, manufacturer))')
+                cur_cursor.copy_expert(query, _DroneCopyStream(drones))
+                loaded = cur_cursor.rowcount
+            connect.commit()
+            return loaded
+        finally:
+            connect_manager.close_connection()
@@ -0,0 +1,691 @@
+from bisect import bisect_left, insort
+import heapq
+import math
+import os
+import threading
+import time
+import numpy as np
+from repo import *
+from snapshot import FleetSnapshot, trigrams
+
+
+SEARCH_FIELDS = {'serial_number': 4, 'model': 5, 'manufacturer': 6}
+# Триграмма, встречающаяся в большем числе термов (и более чем в 1% термов), не порождает кандидатов
+STOP_TRIGRAM_TERMS = 1000
+# Запас по времени при догрузке изменений после выгрузки снимка, в секундах: покрывает транзакции,
+# еще не завершенные на момент выгрузки, и расхождение часов серверов приложения
+SNAPSHOT_CHANGES_MARGIN = 60.0
+
+
+class TrigramIndex:
+    """
+    Класс индекса триграмм для нечеткого поиска.
+    Триграммы строятся по различным значениям полей (термам), а не по записям:
+    моделей и производителей немного, поэтому списки триграмм остаются короткими
+    """
+    def __init__(self, fuzzy_threshold: float = 0.3):
+        """
+        Конструктор класса TrigramIndex
+        :param fuzzy_threshold: Минимальная доля триграмм запроса, которые должны быть в терме
+        """
+        self._terms = {}
+        self._trigrams = {}
+        self._fuzzy_threshold = fuzzy_threshold
+
+    def add(self, term: str, drone_id: int):
+        """
+        Метод добавления терма дрона в индекс
+        :param term: Значение поля в нижнем регистре
+        :param drone_id: id дрона
+        """
+        ids = self._terms.get(term)
+        if ids is None:
+            ids = self._terms[term] = set()
+            for gram in trigrams(term):
+                self._trigrams.setdefault(gram, set()).add(term)
+        ids.add(drone_id)
+
+    def discard(self, term: str, drone_id: int):
+        """
+        Метод удаления терма дрона из индекса
+        :param term: Значение поля в нижнем регистре
+        :param drone_id: id дрона
+        """
+        ids = self._terms.get(term)
+        if ids is None:
+            return
+        ids.discard(drone_id)
+        if not ids:
+            del self._terms[term]
+            for gram in trigrams(term):
+                terms = self._trigrams[gram]
+                terms.discard(term)
+                if not terms:
+                    del self._trigrams[gram]
+
+    def search(self, query: str, limit: int = 20):
+        """
+        Метод нечеткого поиска по триграммам.
+        Терм, содержащий не менее need триграмм запроса, обязательно встречается хотя бы в одном
+        из (len - need + 1) самых коротких списков, поэтому кандидаты собираются только из них,
+        а остальные списки используются лишь для проверки кандидатов. Слишком частые триграммы
+        (например, общий префикс серийных номеров) кандидатов не порождают
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :return: Список id дронов, отсортированный по убыванию сходства
+        """
+        query_grams = trigrams(query)
+        need = max(1, math.ceil(self._fuzzy_threshold * len(query_grams)))
+        postings = sorted((self._trigrams.get(gram, set()) for gram in query_grams), key=len)
+        rare, common = postings[:len(postings) - need + 1], postings[len(postings) - need + 1:]
+        stop_size = max(STOP_TRIGRAM_TERMS, len(self._terms) // 100)
+        common += [terms for terms in rare if len(terms) > stop_size]
+        rare = [terms for terms in rare if len(terms) <= stop_size]
+        shared = {}
+        for terms in rare:
+            for term in terms:
+                shared[term] = shared.get(term, 0) + 1
+        scored = []
+        for term, count in shared.items():
+            count += sum(term in terms for terms in common)
+            if count >= need:
+                scored.append((count / (len(query_grams) + len(term) + 2 - count), term))
+        result = {}
+        for _, term in heapq.nlargest(limit, scored):
+            if len(result) >= limit:
+                break
+            for drone_id in heapq.nsmallest(limit, self._terms[term]):
+                if len(result) >= limit:
+                    break
+                result.setdefault(drone_id, None)
+        return list(result)
+
+
+class SnapshotTrigramIndex:
+    """
+    Класс нечеткого поиска по индексу триграмм, сохраненному в снимке парка дронов.
+    Алгоритм совпадает с TrigramIndex, но списки триграмм и термов читаются из отображенного
+    в память файла, поэтому индекс не строится и не занимает память каждого процесса
+    """
+    def __init__(self, snapshot: FleetSnapshot, fuzzy_threshold: float = 0.3):
+        """
+        Конструктор класса SnapshotTrigramIndex
+        :param snapshot: Открытый снимок парка дронов
+        :param fuzzy_threshold: Минимальная доля триграмм запроса, которые должны быть в терме
+        """
+        self._snapshot = snapshot
+        self._fuzzy_threshold = fuzzy_threshold
+
+    def search(self, query: str, limit: int = 20):
+        """
+        Метод нечеткого поиска по триграммам снимка
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :return: Список id дронов, отсортированный по убыванию сходства
+        """
+        query_grams = trigrams(query)
+        need = max(1, math.ceil(self._fuzzy_threshold * len(query_grams)))
+        postings = sorted((self._snapshot.gram_terms(gram) for gram in query_grams), key=len)
+        rare, common = postings[:len(postings) - need + 1], postings[len(postings) - need + 1:]
+        stop_size = max(STOP_TRIGRAM_TERMS, len(self._snapshot.term_lengths) // 100)
+        common += [terms for terms in rare if len(terms) > stop_size]
+        rare = [terms for terms in rare if len(terms) <= stop_size]
+        if not rare:
+            return []
+        candidates, counts = np.unique(np.concatenate(rare), return_counts=True)
+        for terms in common:
+            if len(terms):
+                position = np.minimum(np.searchsorted(terms, candidates), len(terms) - 1)
+                counts += terms[position] == candidates
+        matched = counts >= need
+        candidates, counts = candidates[matched], counts[matched]
+        scores = counts / (len(query_grams) + self._snapshot.term_lengths[candidates] + 2 - counts)
+        # Термы отсортированы, поэтому при равном сходстве, как и в TrigramIndex, выше больший терм
+        ranked = np.lexsort((candidates, scores))[::-1][:limit]
+        ids = self._snapshot.columns['id']
+        result = {}
+        for term in candidates[ranked]:
+            if len(result) >= limit:
+                break
+            for position in self._snapshot.term_positions(int(term))[:limit]:
+                if len(result) >= limit:
+                    break
+                result.setdefault(int(ids[position]), None)
+        return list(result)
+
+
+class ISearchIndex(ABC):
+    """
+    Интерфейс индекса поиска дронов
+    """
+    @abstractmethod
+    def add(self, row):
+        """
+        Абстрактный метод добавления записи о дроне в индекс (запись с тем же id заменяется)
+        :param row: Запись о дроне в формате таблицы tbl_drones
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, drone_id):
+        """
+        Абстрактный метод удаления записи о дроне из индекса
+        :param drone_id: id дрона
+        """
+        pass
+
+    @abstractmethod
+    def prefix_search(self, prefix: str, limit: int = 20, fields=None):
+        """
+        Абстрактный метод поиска дронов по префиксу (без учета регистра)
+        :param prefix: Префикс для поиска
+        :param limit: Максимальное количество результатов
+        :param fields: Поля для поиска (по умолчанию serial_number, model и manufacturer)
+        :return: Список записей о дронах
+        """
+        pass
+
+    @abstractmethod
+    def fuzzy_search(self, query: str, limit: int = 20):
+        """
+        Абстрактный метод нечеткого поиска дронов по триграммам
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :return: Список записей о дронах, отсортированный по убыванию сходства
+        """
+        pass
+
+    def close(self):
+        """
+        Метод освобождения ресурсов индекса
+        """
+        pass
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = False):
+        """
+        Метод поиска дронов: сначала совпадения по префиксу, затем, при необходимости, нечеткие совпадения
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :param fuzzy: Дополнять ли результат нечеткими совпадениями
+        :return: Список записей о дронах
+        """
+        query = query.strip()
+        if not query:
+            return []
+        result = self.prefix_search(query, limit)
+        if fuzzy and len(result) < limit:
+            seen = {row[0] for row in result}
+            for row in self.fuzzy_search(query, limit):
+                if row[0] not in seen and len(result) < limit:
+                    result.append(row)
+        return result
+
+
+class DroneSearchIndex(ISearchIndex):
+    """
+    Класс индекса в памяти для поиска дронов по префиксу и нечеткого поиска по триграммам
+    """
+    def __init__(self, fuzzy_threshold: float = 0.3):
+        """
+        Конструктор класса DroneSearchIndex
+        :param fuzzy_threshold: Минимальная доля триграмм запроса, которые должны быть в терме
+        """
+        self._rows = {}
+        self._sorted = {field: [] for field in SEARCH_FIELDS}
+        self._fuzzy_threshold = fuzzy_threshold
+        self._trigrams = TrigramIndex(fuzzy_threshold)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, drone_id):
+        return drone_id in self._rows
+
+    def build(self, rows):
+        """
+        Метод построения индекса по списку записей о дронах
+        :param rows: Записи о дронах в формате таблицы tbl_drones
+        """
+        logging.info('Запуск метода build для DroneSearchIndex')
+        with self._lock:
+            self._rows = {row[0]: tuple(row) for row in rows}
+            self._sorted = {field: sorted((row[column].lower(), drone_id) for drone_id, row in self._rows.items())
+                            for field, column in SEARCH_FIELDS.items()}
+            self._trigrams = TrigramIndex(self._fuzzy_threshold)
+            for drone_id, row in self._rows.items():
+                for column in SEARCH_FIELDS.values():
+                    self._trigrams.add(row[column].lower(), drone_id)
+
+    def add(self, row):
+        """
+        Метод добавления записи о дроне в индекс (существующая запись с тем же id заменяется)
+        :param row: Запись о дроне в формате таблицы tbl_drones
+        """
+        row = tuple(row)
+        with self._lock:
+            if row[0] in self._rows:
+                self.remove(row[0])
+            self._rows[row[0]] = row
+            for field, column in SEARCH_FIELDS.items():
+                insort(self._sorted[field], (row[column].lower(), row[0]))
+                self._trigrams.add(row[column].lower(), row[0])
+
+    def remove(self, drone_id):
+        """
+        Метод удаления записи о дроне из индекса
+        :param drone_id: id дрона
+        """
+        with self._lock:
+            row = self._rows.pop(drone_id, None)
+            if row is None:
+                return
+            for field, column in SEARCH_FIELDS.items():
+                keys = self._sorted[field]
+                position = bisect_left(keys, (row[column].lower(), drone_id))
+                if position < len(keys) and keys[position] == (row[column].lower(), drone_id):
+                    del keys[position]
+                self._trigrams.discard(row[column].lower(), drone_id)
+
+    def prefix_search(self, prefix: str, limit: int = 20, fields=None):
+        """
+        Метод поиска дронов по префиксу через бинарный поиск в отсортированных массивах
+        :param prefix: Префикс для поиска (без учета регистра)
+        :param limit: Максимальное количество результатов
+        :param fields: Поля для поиска (по умолчанию serial_number, model и manufacturer)
+        :return: Список записей о дронах
+        """
+        prefix = prefix.lower()
+        found = {}
+        with self._lock:
+            for field in fields or SEARCH_FIELDS:
+                keys = self._sorted[field]
+                position = bisect_left(keys, (prefix,))
+                while position < len(keys) and len(found) < limit:
+                    key, drone_id = keys[position]
+                    if not key.startswith(prefix):
+                        break
+                    found.setdefault(drone_id, self._rows[drone_id])
+                    position += 1
+        return list(found.values())
+
+    def fuzzy_search(self, query: str, limit: int = 20):
+        """
+        Метод нечеткого поиска дронов по триграммам
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :return: Список записей о дронах, отсортированный по убыванию сходства
+        """
+        with self._lock:
+            return [self._rows[drone_id] for drone_id in self._trigrams.search(query, limit)]
+
+
+class SnapshotSearchIndex(ISearchIndex):
+    """
+    Класс индекса поиска поверх снимка парка дронов, отображенного в память.
+    Поиск по id и по префиксу выполняется бинарным поиском прямо по столбцам снимка,
+    а нечеткий поиск - по индексу триграмм из снимка, поэтому индекс готов сразу после открытия файла
+    и не копирует снимок в память процесса. Изменения после выгрузки снимка
+    хранятся в индексе в памяти, а измененные и удаленные записи снимка скрываются
+    """
+    def __init__(self, snapshot: FleetSnapshot, fuzzy_threshold: float = 0.3):
+        """
+        Конструктор класса SnapshotSearchIndex
+        :param snapshot: Открытый снимок парка дронов (закрывается вместе с индексом)
+        :param fuzzy_threshold: Минимальная доля триграмм запроса, которые должны быть в терме
+        """
+        self._snapshot = snapshot
+        self._overlay = DroneSearchIndex(fuzzy_threshold)
+        self._hidden = set()
+        self._base_trigrams = SnapshotTrigramIndex(snapshot, fuzzy_threshold)
+        self._closed = threading.Event()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._snapshot) - len(self._hidden) + len(self._overlay)
+
+    def __contains__(self, drone_id):
+        if drone_id in self._overlay:
+            return True
+        return drone_id not in self._hidden and self._snapshot.index_of(drone_id) is not None
+
+    def _hide(self, drone_id):
+        """
+        Метод скрытия записи снимка, замененной или удаленной после выгрузки
+        :param drone_id: id дрона
+        """
+        if self._snapshot.index_of(drone_id) is not None:
+            self._hidden.add(drone_id)
+
+    def add(self, row):
+        """
+        Метод добавления записи о дроне (запись снимка с тем же id скрывается)
+        :param row: Запись о дроне в формате таблицы tbl_drones
+        """
+        with self._lock:
+            self._hide(row[0])
+            self._overlay.add(row)
+
+    def remove(self, drone_id):
+        """
+        Метод удаления записи о дроне
+        :param drone_id: id дрона
+        """
+        with self._lock:
+            self._hide(drone_id)
+            self._overlay.remove(drone_id)
+
+    def prefix_search(self, prefix: str, limit: int = 20, fields=None):
+        """
+        Метод поиска дронов по префиксу: сначала изменения после выгрузки, затем записи снимка
+        :param prefix: Префикс для поиска (без учета регистра)
+        :param limit: Максимальное количество результатов
+        :param fields: Поля для поиска (по умолчанию serial_number, model и manufacturer)
+        :return: Список записей о дронах
+        """
+        with self._lock:
+            self._check_open()
+            found = {row[0]: row for row in self._overlay.prefix_search(prefix, limit, fields)}
+            ids = self._snapshot.columns['id']
+            for field in fields or SEARCH_FIELDS:
+                if len(found) >= limit:
+                    break
+                for position in self._snapshot.prefix_indices(field, prefix):
+                    drone_id = int(ids[position])
+                    if drone_id not in self._hidden and drone_id not in found:
+                        found[drone_id] = self._snapshot.row(position)
+                        if len(found) >= limit:
+                            break
+        return list(found.values())
+
+    def fuzzy_search(self, query: str, limit: int = 20):
+        """
+        Метод нечеткого поиска дронов по триграммам
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :return: Список записей о дронах
+        """
+        with self._lock:
+            self._check_open()
+            found = {row[0]: row for row in self._overlay.fuzzy_search(query, limit)}
+            for drone_id in self._base_trigrams.search(query, limit + len(self._hidden)):
+                if len(found) >= limit:
+                    break
+                if drone_id not in self._hidden and drone_id not in found:
+                    found[drone_id] = self._snapshot.find(drone_id)
+        return list(found.values())
+
+    def _check_open(self):
+        """
+        Метод проверки, что индекс не закрыт (снимок еще отображен в память)
+        """
+        if self._closed.is_set():
+            raise RuntimeError('Индекс поиска по снимку закрыт')
+
+    def close(self):
+        """
+        Метод закрытия индекса и снимка. Выполняющиеся поиски завершаются до закрытия снимка,
+        последующие выбрасывают RuntimeError
+        """
+        self._closed.set()
+        with self._lock:
+            self._snapshot.close()
+
+
+class SearchableDroneRepository(IDroneRepository):
+    """
+    Репозиторий-обертка, поддерживающий индекс поиска в актуальном состоянии
+    при добавлении, обновлении и удалении дронов.
+    Индекс хранится в памяти процесса и видит только изменения, прошедшие через этот экземпляр:
+    изменения, сделанные другими процессами сервера, попадают в индекс только при перестроении,
+    поэтому для нескольких процессов следует задавать refresh_interval.
+    Перестроение выполняется в фоновом потоке: до его окончания поиск обслуживается прежним индексом.
+    При заданном snapshot_path индекс открывается поверх снимка парка дронов без чтения всей таблицы:
+    снимок старше snapshot_max_age секунд не используется, дроны, добавленные после выгрузки,
+    догружаются из репозитория, а измененные и удаленные после выгрузки - по журналу изменений
+    репозитория (без журнала снимок не используется). Перестроение открывает снимок заново,
+    поэтому подхватывает более новую выгрузку и стоит лишь догрузки изменений
+    """
+    def __init__(self, repository: IDroneRepository, index: DroneSearchIndex = None, snapshot_path: str = None,
+                 refresh_interval: float = None, snapshot_max_age: float = None):
+        """
+        Конструктор класса SearchableDroneRepository
+        :param repository: Репозиторий, в котором хранятся дроны
+        :param index: Индекс поиска, строящийся из репозитория при первом поиске
+        :param snapshot_path: Путь к снимку парка дронов для запуска без чтения всей таблицы
+        :param refresh_interval: Период перестроения индекса из репозитория в секундах (None - не перестраивать)
+        :param snapshot_max_age: Максимальный возраст снимка в секундах (None - без ограничения)
+        """
+        self._repository = repository
+        self._snapshot_path = snapshot_path
+        self._snapshot_max_age = snapshot_max_age
+        self._memory_index = index if index is not None else DroneSearchIndex()
+        self._index = self._memory_index
+        self._refresh_interval = refresh_interval
+        self._loaded = False
+        self._stale = False
+        self._loaded_at = 0.0
+        self._journal = None
+        self._builder = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def refresh(self):
+        """
+        Метод перестроения индекса из репозитория в фоновом потоке при следующем поиске
+        """
+        with self._lock:
+            self._stale = True
+
+    def wait_refresh(self, timeout: float = None):
+        """
+        Метод ожидания окончания фонового перестроения индекса
+        :param timeout: Максимальное время ожидания в секундах
+        :return: True, если перестроение не выполняется
+        """
+        builder = self._builder
+        if builder is not None:
+            builder.join(timeout)
+            return not builder.is_alive()
+        return True
+
+    def _open_snapshot(self):
+        """
+        Метод открытия индекса поверх снимка с догрузкой дронов, добавленных, измененных и удаленных после выгрузки
+        :return: Объект, реализующий класс SnapshotSearchIndex, или None, если снимок нельзя использовать
+        """
+        if not os.path.exists(self._snapshot_path):
+            return None
+        try:
+            snapshot = FleetSnapshot(self._snapshot_path)
+        except ValueError as e:
+            logging.warning(f'Снимок {self._snapshot_path} не используется: {e}')
+            return None
+        age = time.time() - snapshot.exported_at
+        if self._snapshot_max_age is not None and age > self._snapshot_max_age:
+            logging.warning(f'Снимок {self._snapshot_path} устарел ({age:.0f} с) и не используется')
+            snapshot.close()
+            return None
+        changes = self._repository.get_changes_since(snapshot.exported_at - SNAPSHOT_CHANGES_MARGIN)
+        if changes is None:
+            logging.warning(f'Репозиторий не ведет журнал изменений, снимок {self._snapshot_path} не используется')
+            snapshot.close()
+            return None
+        index = SnapshotSearchIndex(snapshot)
+        for row in self._repository.get_drones_after(snapshot.max_id):
+            index.add(row)
+        for drone_id, row in changes.items():
+            if row is None:
+                index.remove(drone_id)
+            else:
+                index.add(row)
+        return index
+
+    def _build_index(self):
+        """
+        Метод построения нового индекса без блокировки методов изменения дронов.
+        Изменения, записанные во время построения, сохраняются в журнал и применяются
+        к новому индексу перед его подменой под блокировкой
+        """
+        with self._lock:
+            self._journal = []
+            # Индекс, переданный в конструктор, еще не обслуживает поиск только при первом построении
+            memory_index = self._memory_index if not self._loaded else DroneSearchIndex()
+        try:
+            index = self._open_snapshot() if self._snapshot_path else None
+            if index is None:
+                index = memory_index
+                index.build(self._repository.get_all_drones())
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            for drone_id, row in self._journal:
+                if row is None:
+                    index.remove(drone_id)
+                else:
+                    index.add(row)
+            self._journal = None
+            previous, self._index = self._index, index
+            self._loaded = True
+            self._stale = False
+            self._loaded_at = time.monotonic()
+        if previous is not index:
+            previous.close()
+
+    def _refresh_index(self):
+        """
+        Метод фонового перестроения индекса. При ошибке поиск продолжает обслуживаться прежним индексом
+        """
+        try:
+            with self._build_lock:
+                self._build_index()
+        except Exception:
+            logging.exception('Ошибка перестроения индекса поиска')
+            with self._lock:
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._builder = None
+
+    def _ensure_index(self):
+        """
+        Метод построения индекса при первом обращении и запуска фонового перестроения
+        по истечении refresh_interval
+        """
+        with self._lock:
+            if self._loaded:
+                due = self._stale or (self._refresh_interval is not None
+                                      and time.monotonic() - self._loaded_at > self._refresh_interval)
+                if due and self._builder is None:
+                    self._builder = threading.Thread(target=self._refresh_index, daemon=True)
+                    self._builder.start()
+                return
+        with self._build_lock:
+            if not self._loaded:
+                self._build_index()
+
+    def _apply(self, drone_id: int, row):
+        """
+        Метод применения изменения дрона к индексу и к журналу выполняющегося перестроения
+        :param drone_id: id дрона
+        :param row: Новая запись о дроне или None, если дрон удален
+        """
+        with self._lock:
+            if self._loaded:
+                if row is None:
+                    self._index.remove(drone_id)
+                else:
+                    self._index.add(row)
+            if self._journal is not None:
+                self._journal.append((drone_id, row))
+
+    def get_all_drones(self):
+        """
+        Метод получения списока всех дронов
+        :return: Список всех дронов
+        """
+        return self._repository.get_all_drones()
+
+    def get_drone_by_id(self, drone_id: int):
+        """
+        Метод получения конктретного дрона
+        :param drone_id: id дрона
+        :return: Полученный дрон
+        """
+        return self._repository.get_drone_by_id(drone_id)
+
+    def add_drone(self, drone: Drone):
+        """
+        Метод добавления дрона в репозиторий и в индекс поиска
+        :param drone: Объект, реализующий класс Drone
+        :return: id добавленного дрона
+        """
+        logging.info('Запуск метода add_drone для SearchableDroneRepository')
+        drone_id = self._repository.add_drone(drone)
+        if drone_id is not None:
+            self._apply(drone_id, (drone_id, drone.max_altitude, drone.max_speed, drone.max_flight_time,
+                                   drone.serial_number, drone.model, drone.manufacturer))
+        return drone_id
+
+    def remove_drone(self, drone_id: int):
+        """
+        Метод удаления дрона из репозитория и из индекса поиска
+        :param drone_id: id дрона для удаления
+        :return: True, если дрон был удален
+        """
+        logging.info('Запуск метода remove_drone для SearchableDroneRepository')
+        removed = self._repository.remove_drone(drone_id)
+        if removed:
+            self._apply(int(drone_id), None)
+        return removed
+
+    def update_drone(self, drone_id: int, drone: Drone):
+        """
+        Метод обновления данных дрона в репозитории и в индексе поиска
+        :param drone_id: id дрона для обновления данных
+        :param drone: Объект, реализующий класс Drone, с новыми данными
+        :return: True, если дрон был обновлен
+        """
+        logging.info('Запуск метода update_drone для SearchableDroneRepository')
+        updated = self._repository.update_drone(drone_id, drone)
+        if updated:
+            self._apply(int(drone_id), (int(drone_id), drone.max_altitude, drone.max_speed, drone.max_flight_time,
+                                        drone.serial_number, drone.model, drone.manufacturer))
+        return updated
+
+    def get_drones_after(self, drone_id: int):
+        """
+        Метод получения дронов с id больше заданного
+        :param drone_id: id, после которого нужны дроны
+        :return: Список записей о дронах
+        """
+        return self._repository.get_drones_after(drone_id)
+
+    def export_snapshot(self, path: str):
+        """
+        Метод выгрузки всех дронов репозитория в бинарный снимок
+        :param path: Путь к файлу снимка
+        :return: Количество выгруженных дронов
+        """
+        return self._repository.export_snapshot(path)
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = False):
+        """
+        Метод поиска дронов по серийному номеру, модели и производителю
+        :param query: Строка для поиска
+        :param limit: Максимальное количество результатов
+        :param fuzzy: Дополнять ли результат нечеткими совпадениями
+        :return: Список записей о дронах
+        """
+        logging.info('Запуск метода search для SearchableDroneRepository')
+        self._ensure_index()
+        while True:
+            index = self._index
+            try:
+                return index.search(query, limit, fuzzy)
+            except RuntimeError:
+                # Индекс закрыт после подмены перестроенным: повторяем поиск по новому
+                if index is self._index:
+                    raise
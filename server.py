@@ -1,11 +1,25 @@
-from flask import Flask, request, render_template
+import os
+from flask import Flask, request, render_template, jsonify
 from repo import *
+from search import *
 from mission import *
 import cProfile
 
 app = Flask(__name__)
-repository = SqliteDroneRepository()
-drone_controller = DroneController()
+SNAPSHOT_PATH = os.environ.get('BPLA_SNAPSHOT')
+# Поверх снимка перестроение стоит лишь догрузки изменений, поэтому по умолчанию выполняется раз в минуту
+SEARCH_REFRESH = os.environ.get('BPLA_SEARCH_REFRESH', '60' if SNAPSHOT_PATH else '')
+SEARCH_LIMIT_MAX = 100
+repository = SearchableDroneRepository(SqliteDroneRepository(), snapshot_path=SNAPSHOT_PATH,
+                                       refresh_interval=float(SEARCH_REFRESH) if SEARCH_REFRESH else None,
+                                       snapshot_max_age=float(os.environ.get('BPLA_SNAPSHOT_MAX_AGE', 3600)))
+DRONE_ADDR = os.environ.get('BPLA_DRONE_ADDR')
+if DRONE_ADDR:
+    drone_host, _, drone_port = DRONE_ADDR.rpartition(':')
+    drone_controller = DroneController(UdpDroneTransport((drone_host, int(drone_port))),
+                                       drone_id=int(os.environ.get('BPLA_DRONE_ID', 0)))
+else:
+    drone_controller = DroneController()
 context = DroneContext()
 PATH = 'templates/mission.html'
 
@@ -32,6 +46,21 @@ def get_drones():
     return render_template('all_drones.html', data=data)
 
 
+@app.route('/drones/search', methods=['GET'])
+def search_drones():
+    """
+    Функция поиска дронов по префиксу серийного номера, модели или производителя
+    (параметр fuzzy=1 включает нечеткий поиск по триграммам)
+    :return: JSON-список найденных дронов
+    """
+    app.logger.info('Запуск функции search_drones')
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), SEARCH_LIMIT_MAX)
+    fuzzy = request.args.get('fuzzy', '0').lower() in ('1', 'true', 'yes')
+    data = repository.search(query, limit=limit, fuzzy=fuzzy)
+    return jsonify([dict(zip(['id'] + DRONE_COLUMNS, row)) for row in data])
+
+
 @app.route('/drones/<drone_id>', methods=['GET', 'POST', 'UPDATE', 'DELETE'])
 def actions_drone_by_id(drone_id):
     """
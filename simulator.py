@@ -0,0 +1,175 @@
+import argparse
+import logging
+import math
+import multiprocessing
+import queue
+import random
+import socket
+from transport import *
+
+
+# Количество последних статусов команд, которые дрон хранит для повторных подтверждений
+STATUS_HISTORY = 4096
+
+
+class SimulatedDrone:
+    """
+    Класс состояния одного симулируемого дрона
+    """
+    def __init__(self, drone_id: int):
+        """
+        Конструктор класса SimulatedDrone
+        :param drone_id: id дрона
+        """
+        self.drone_id = drone_id
+        self.airborne = False
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.session = None
+        self.epoch = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Метод сброса нумерации команд при смене сессии или эпохи транспорта
+        """
+        self.next_sequence = 1
+        self.buffered = {}
+        self.statuses = {}
+
+    def receive(self, session: int, epoch: int, sequence: int, opcode: int, argument: float):
+        """
+        Метод приема команды: команды применяются строго в порядке порядковых номеров,
+        пришедшие раньше времени ожидают пропущенные, повторные не применяются повторно.
+        Команда новой сессии или более новой эпохи сбрасывает нумерацию, команды старой эпохи отбрасываются
+        :param session: Сессия транспорта
+        :param epoch: Эпоха нумерации команд
+        :param sequence: Порядковый номер команды
+        :param opcode: Код команды
+        :param argument: Аргумент команды
+        :return: Список пар (порядковый номер, статус) для подтверждения
+        """
+        if session != self.session or epoch > self.epoch:
+            self.session, self.epoch = session, epoch
+            self.reset()
+        elif epoch < self.epoch:
+            return []
+        if sequence < self.next_sequence:
+            status = self.statuses.get(sequence)
+            return [] if status is None else [(sequence, status)]
+        self.buffered[sequence] = (opcode, argument)
+        acks = []
+        while self.next_sequence in self.buffered:
+            status = self.apply(*self.buffered.pop(self.next_sequence))
+            self.statuses[self.next_sequence] = status
+            self.statuses.pop(self.next_sequence - STATUS_HISTORY, None)
+            acks.append((self.next_sequence, status))
+            self.next_sequence += 1
+        return acks
+
+    def apply(self, opcode: int, argument: float):
+        """
+        Метод применения команды к состоянию дрона
+        :param opcode: Код команды
+        :param argument: Аргумент команды
+        :return: Статус выполнения команды
+        """
+        if opcode == OPCODE_TAKEOFF:
+            self.airborne = True
+        elif opcode == OPCODE_MOVE_FORWARD and self.airborne:
+            self.x += argument * math.cos(math.radians(self.heading))
+            self.y += argument * math.sin(math.radians(self.heading))
+        elif opcode == OPCODE_TURN and self.airborne:
+            self.heading = (self.heading + argument) % 360
+        else:
+            return STATUS_REJECTED
+        return STATUS_OK
+
+
+def run_simulator(host: str, port: int, loss_rate: float = 0.0, ready=None):
+    """
+    Функция работы симулятора парка дронов: принимает команды по UDP, применяет их
+    к состоянию соответствующего дрона в порядке порядковых номеров и отправляет подтверждения
+    :param host: Адрес для приема команд
+    :param port: Порт для приема команд
+    :param loss_rate: Доля входящих пакетов, которые симулятор отбрасывает (имитация потерь в сети)
+    :param ready: Очередь, в которую после открытия сокета передается номер порта (важно при port=0)
+    """
+    logging.info('Запуск функции run_simulator')
+    drones = {}
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    if ready is not None:
+        ready.put(sock.getsockname()[1])
+    while True:
+        data, address = sock.recvfrom(COMMAND_PACKET.size)
+        if len(data) != COMMAND_PACKET.size or random.random() < loss_rate:
+            continue
+        magic, session, epoch, drone_id, sequence, opcode, argument = COMMAND_PACKET.unpack(data)
+        if magic != PROTOCOL_MAGIC:
+            continue
+        if drone_id not in drones:
+            drones[drone_id] = SimulatedDrone(drone_id)
+        for acked, status in drones[drone_id].receive(session, epoch, sequence, opcode, argument):
+            sock.sendto(ACK_PACKET.pack(PROTOCOL_MAGIC, session, epoch, drone_id, acked, status), address)
+
+
+class DroneSimulator:
+    """
+    Класс управления локальным симулятором дронов, запущенным в отдельном процессе
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 9750, loss_rate: float = 0.0):
+        """
+        Конструктор класса DroneSimulator
+        :param host: Адрес симулятора
+        :param port: Порт симулятора, 0 - любой свободный порт
+        :param loss_rate: Доля отбрасываемых входящих пакетов
+        """
+        self.address = (host, port)
+        self._loss_rate = loss_rate
+        self._process = None
+
+    def start(self):
+        """
+        Метод запуска процесса симулятора
+        :return: Экземпляр класса DroneSimulator
+        """
+        logging.info('Запуск метода start для DroneSimulator')
+        # spawn: процесс, создающий симулятор, может быть многопоточным (транспорт, сервер)
+        spawn = multiprocessing.get_context('spawn')
+        ready = spawn.Queue()
+        self._process = spawn.Process(target=run_simulator,
+                                                args=(*self.address, self._loss_rate, ready), daemon=True)
+        self._process.start()
+        try:
+            self.address = (self.address[0], ready.get(timeout=5))
+        except queue.Empty:
+            self.stop()
+            raise RuntimeError('Симулятор дронов не запустился')
+        return self
+
+    def stop(self):
+        """
+        Метод остановки процесса симулятора
+        """
+        logging.info('Запуск метода stop для DroneSimulator')
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Локальный симулятор парка дронов')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9750)
+    parser.add_argument('--loss-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    run_simulator(args.host, args.port, args.loss_rate)
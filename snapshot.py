@@ -0,0 +1,398 @@
+from array import array
+import argparse
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import numpy as np
+
+
+SNAPSHOT_MAGIC = b'BPLASNAP'
+SNAPSHOT_VERSION = 3
+# magic, версия, зарезервировано, количество дронов, максимальный id, время выгрузки (unix),
+# размеры строковых таблиц serial_number, model, manufacturer,
+# количество термов, размер таблицы термов, количество пар (терм, запись),
+# количество триграмм, размер таблицы триграмм, количество пар (триграмма, терм)
+SNAPSHOT_HEADER = struct.Struct('<8sIIQqdQQQQQQQQQ')
+NUMERIC_COLUMNS = ['max_altitude', 'max_speed', 'max_flight_time']
+STRING_COLUMNS = ['serial_number', 'model', 'manufacturer']
+
+
+def trigrams(text: str):
+    """
+    Функция разбиения строки на триграммы
+    :param text: Исходная строка
+    :return: Множество триграмм строки (с дополнением пробелами по краям)
+    """
+    padded = f'  {text.lower()} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _align(size: int):
+    """
+    Функция выравнивания размера секции по границе 8 байт
+    :param size: Размер секции в байтах
+    :return: Выровненный размер
+    """
+    return (size + 7) & ~7
+
+
+def _write_section(file, data):
+    """
+    Функция записи секции снимка с дополнением нулями до границы 8 байт
+    :param file: Файл снимка, открытый на запись
+    :param data: Данные секции
+    """
+    file.write(data)
+    file.write(b'\0' * (_align(len(data)) - len(data)))
+
+
+def _write_strings(file, values):
+    """
+    Функция записи таблицы строк: массив смещений (int64, len + 1) и строки в UTF-8
+    :param file: Файл снимка, открытый на запись
+    :param values: Строки
+    :return: Размер таблицы строк в байтах
+    """
+    offsets = array('q', [0])
+    heap = bytearray()
+    for value in values:
+        heap += value.encode('utf-8')
+        offsets.append(len(heap))
+    _write_section(file, np.asarray(offsets, dtype='<i8').tobytes())
+    _write_section(file, heap)
+    return len(heap)
+
+
+def _write_postings(file, postings, dtype: str):
+    """
+    Функция записи списков (CSR): массив смещений (int64, len + 1) и значения всех списков подряд
+    :param file: Файл снимка, открытый на запись
+    :param postings: Списки значений
+    :param dtype: Тип значений
+    """
+    offsets = np.zeros(len(postings) + 1, dtype='<i8')
+    np.cumsum(np.fromiter(map(len, postings), dtype='<i8', count=len(postings)), out=offsets[1:])
+    _write_section(file, offsets.tobytes())
+    _write_section(file, np.fromiter((value for values in postings for value in values), dtype=dtype,
+                                     count=int(offsets[-1])).tobytes())
+
+
+def _layout(count: int, heap_sizes, term_count: int, term_heap: int, term_rows: int,
+            gram_count: int, gram_heap: int, gram_terms: int):
+    """
+    Функция расчета расположения секций снимка
+    :return: Список секций (имя, тип NumPy или None для таблицы строк, количество элементов или байт)
+    """
+    sections = [('id', '<i8', count)]
+    sections += [(name, '<i4', count) for name in NUMERIC_COLUMNS]
+    for name, heap_size in zip(STRING_COLUMNS, heap_sizes):
+        sections += [(f'{name}.offsets', '<i8', count + 1), (f'{name}.heap', None, heap_size),
+                     (f'{name}.order', '<i8', count)]
+    sections += [('term.offsets', '<i8', term_count + 1), ('term.heap', None, term_heap),
+                 ('term.lengths', '<i4', term_count),
+                 ('term.row_offsets', '<i8', term_count + 1), ('term.rows', '<i8', term_rows),
+                 ('gram.offsets', '<i8', gram_count + 1), ('gram.heap', None, gram_heap),
+                 ('gram.term_offsets', '<i8', gram_count + 1), ('gram.terms', '<i4', gram_terms)]
+    return sections
+
+
+def write_snapshot(path: str, rows, exported_at: float = None):
+    """
+    Функция записи снимка парка дронов в бинарный файл.
+    Формат (little-endian, секции выровнены по 8 байт): заголовок, столбец id (int64),
+    числовые столбцы (int32), затем для каждого строкового столбца массив смещений (int64, count + 1),
+    таблица строк в UTF-8 и порядок записей (int64, count), отсортированный по значению в нижнем регистре.
+    Далее индекс триграмм для нечеткого поиска: отсортированные различные значения полей
+    в нижнем регистре (термы) с их длинами и номерами записей, отсортированные триграммы
+    с номерами термов. Индекс триграмм читается через mmap и разделяется между процессами.
+    Файл записывается во временный и атомарно подменяет старый снимок,
+    поэтому процессы, уже отобразившие старый снимок в память, продолжают работать с ним
+    :param path: Путь к файлу снимка
+    :param rows: Записи о дронах в формате таблицы tbl_drones, упорядоченные по id
+    :param exported_at: Время начала чтения записей (unix), по умолчанию - время вызова функции
+    :return: Количество записанных дронов
+    """
+    logging.info('Запуск функции write_snapshot')
+    if exported_at is None:
+        exported_at = time.time()
+    ids = array('q')
+    numeric = [array('i') for _ in NUMERIC_COLUMNS]
+    values = [[] for _ in STRING_COLUMNS]
+    term_rows = {}
+    for position, row in enumerate(rows):
+        if ids and row[0] <= ids[-1]:
+            raise ValueError('Записи снимка должны быть упорядочены по id')
+        ids.append(row[0])
+        for column, value in zip(numeric, row[1:4]):
+            column.append(value)
+        for column, value in zip(values, row[4:7]):
+            column.append(value)
+            positions = term_rows.setdefault(value.lower(), [])
+            if not positions or positions[-1] != position:
+                positions.append(position)
+    terms = sorted(term_rows)
+    gram_terms = {}
+    for term_index, term in enumerate(terms):
+        for gram in trigrams(term):
+            gram_terms.setdefault(gram, []).append(term_index)
+    grams = sorted(gram_terms)
+
+    directory = os.path.dirname(path) or '.'
+    descriptor, tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(b'\0' * SNAPSHOT_HEADER.size)
+            _write_section(file, np.asarray(ids, dtype='<i8').tobytes())
+            for column in numeric:
+                _write_section(file, np.asarray(column, dtype='<i4').tobytes())
+            heap_sizes = []
+            for column in values:
+                heap_sizes.append(_write_strings(file, column))
+                keys = [value.lower() for value in column]
+                order = sorted(range(len(keys)), key=keys.__getitem__)
+                _write_section(file, np.asarray(order, dtype='<i8').tobytes())
+            term_heap = _write_strings(file, terms)
+            _write_section(file, np.fromiter(map(len, terms), dtype='<i4', count=len(terms)).tobytes())
+            _write_postings(file, [term_rows[term] for term in terms], '<i8')
+            gram_heap = _write_strings(file, grams)
+            _write_postings(file, [gram_terms[gram] for gram in grams], '<i4')
+            file.seek(0)
+            file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(ids), ids[-1] if ids else 0,
+                                            exported_at, *heap_sizes, len(terms), term_heap,
+                                            sum(map(len, term_rows.values())), len(grams), gram_heap,
+                                            sum(map(len, gram_terms.values()))))
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return len(ids)
+
+
+class FleetSnapshot:
+    """
+    Класс чтения снимка парка дронов через mmap.
+    Столбцы и индекс триграмм доступны как NumPy-массивы без копирования данных, страницы файла
+    разделяются между всеми процессами, открывшими один и тот же снимок
+    """
+    def __init__(self, path: str):
+        """
+        Конструктор класса FleetSnapshot
+        :param path: Путь к файлу снимка
+        """
+        logging.info('Запуск конструктора FleetSnapshot')
+        self._path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._map(path)
+        except Exception:
+            self.columns = {}
+            self._sections = {}
+            self._mmap.close()
+            raise
+
+    def _map(self, path: str):
+        """
+        Метод разбора заголовка и отображения секций снимка в массивы
+        :param path: Путь к файлу снимка
+        """
+        self.columns = {}
+        self._sections = {}
+        if len(self._mmap) < SNAPSHOT_HEADER.size:
+            raise ValueError(f'Файл {path} не является снимком парка дронов')
+        magic, version = struct.unpack_from('<8sI', self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f'Файл {path} не является снимком парка дронов')
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'Неподдерживаемая версия снимка: {version}')
+        _, _, _, count, max_id, exported_at, *sizes = SNAPSHOT_HEADER.unpack_from(self._mmap, 0)
+        layout = _layout(count, sizes[:3], *sizes[3:])
+        size = SNAPSHOT_HEADER.size + sum(_align(length * (np.dtype(dtype).itemsize if dtype else 1))
+                                          for _, dtype, length in layout)
+        if len(self._mmap) < size:
+            raise ValueError(f'Снимок {path} поврежден: ожидалось {size} байт, получено {len(self._mmap)}')
+        self._count = count
+        self.max_id = max_id
+        self.exported_at = exported_at
+        position = SNAPSHOT_HEADER.size
+        for name, dtype, length in layout:
+            if dtype is None:
+                self._sections[name] = position
+                position += _align(length)
+            else:
+                self._sections[name] = np.frombuffer(self._mmap, dtype=dtype, count=length, offset=position)
+                position += _align(length * np.dtype(dtype).itemsize)
+        self.columns['id'] = self._sections['id']
+        for name in NUMERIC_COLUMNS:
+            self.columns[name] = self._sections[name]
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def string(self, name: str, index: int):
+        """
+        Метод получения строкового значения по номеру записи
+        :param name: Наименование строкового столбца
+        :param index: Номер записи в снимке
+        :return: Строковое значение
+        """
+        return self._decode(name, index)
+
+    def _decode(self, name: str, index: int):
+        """
+        Метод чтения строки из таблицы строк снимка
+        :param name: Наименование таблицы строк
+        :param index: Номер строки
+        :return: Строковое значение
+        """
+        start = self._sections[f'{name}.heap']
+        offsets = self._sections[f'{name}.offsets']
+        return self._mmap[start + int(offsets[index]):start + int(offsets[index + 1])].decode('utf-8')
+
+    def row(self, index: int):
+        """
+        Метод получения записи о дроне по номеру в снимке
+        :param index: Номер записи в снимке
+        :return: Запись о дроне в формате таблицы tbl_drones
+        """
+        return (int(self.columns['id'][index]),
+                *(int(self.columns[name][index]) for name in NUMERIC_COLUMNS),
+                *(self.string(name, index) for name in STRING_COLUMNS))
+
+    def rows(self):
+        """
+        Метод последовательного получения всех записей о дронах
+        :return: Генератор записей о дронах
+        """
+        for index in range(self._count):
+            yield self.row(index)
+
+    def index_of(self, drone_id: int):
+        """
+        Метод поиска номера записи по id бинарным поиском
+        :param drone_id: id дрона
+        :return: Номер записи в снимке или None, если дрон не найден
+        """
+        index = int(np.searchsorted(self.columns['id'], drone_id))
+        if index < self._count and self.columns['id'][index] == drone_id:
+            return index
+        return None
+
+    def find(self, drone_id: int):
+        """
+        Метод поиска записи о дроне по id
+        :param drone_id: id дрона
+        :return: Запись о дроне или None, если дрон не найден
+        """
+        index = self.index_of(drone_id)
+        return None if index is None else self.row(index)
+
+    def prefix_indices(self, name: str, prefix: str):
+        """
+        Метод поиска записей по префиксу строкового столбца (без учета регистра)
+        бинарным поиском по сохраненному в снимке порядку записей
+        :param name: Наименование строкового столбца
+        :param prefix: Префикс для поиска
+        :return: Генератор номеров записей в порядке возрастания значения
+        """
+        prefix = prefix.lower()
+        order = self._sections[f'{name}.order']
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(name, int(order[middle])).lower() < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self._count:
+            index = int(order[low])
+            if not self.string(name, index).lower().startswith(prefix):
+                break
+            yield index
+            low += 1
+
+    @property
+    def term_lengths(self):
+        """
+        Длины термов индекса триграмм в символах
+        """
+        return self._sections['term.lengths']
+
+    def term(self, index: int):
+        """
+        Метод получения терма индекса триграмм по номеру
+        :param index: Номер терма
+        :return: Значение поля в нижнем регистре
+        """
+        return self._decode('term', index)
+
+    def term_positions(self, index: int):
+        """
+        Метод получения номеров записей, в полях которых встречается терм
+        :param index: Номер терма
+        :return: Массив номеров записей в порядке возрастания
+        """
+        offsets = self._sections['term.row_offsets']
+        return self._sections['term.rows'][offsets[index]:offsets[index + 1]]
+
+    def gram_terms(self, gram: str):
+        """
+        Метод поиска термов, содержащих триграмму, бинарным поиском по таблице триграмм
+        :param gram: Триграмма
+        :return: Массив номеров термов в порядке возрастания (пустой, если триграммы нет в снимке)
+        """
+        offsets = self._sections['gram.term_offsets']
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if self._decode('gram', middle) < gram:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(offsets) - 1 and self._decode('gram', low) == gram:
+            return self._sections['gram.terms'][offsets[low]:offsets[low + 1]]
+        return self._sections['gram.terms'][:0]
+
+    def close(self):
+        """
+        Метод закрытия снимка. Если вне объекта остались ссылки на массивы столбцов,
+        mmap не может быть закрыт: выбрасывается BufferError, а снимок остается открытым
+        """
+        self.columns, self._sections = {}, {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            self._map(self._path)
+            raise
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Снимок парка дронов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export_parser = subparsers.add_parser('export', help='Выгрузить парк дронов из базы данных в снимок')
+    export_parser.add_argument('path')
+    export_parser.add_argument('--db', choices=['sqlite', 'postgres'], default='sqlite')
+    info_parser = subparsers.add_parser('info', help='Вывести сведения о снимке')
+    info_parser.add_argument('path')
+    args = parser.parse_args()
+    if args.command == 'export':
+        from repo import SqliteDroneRepository, PostgresDroneRepository
+        repository = PostgresDroneRepository() if args.db == 'postgres' else SqliteDroneRepository()
+        print(f'Выгружено дронов: {repository.export_snapshot(args.path)}')
+    else:
+        with FleetSnapshot(args.path) as snapshot:
+            print(f'Дронов: {len(snapshot)}, максимальный id: {snapshot.max_id}, '
+                  f'выгружен: {time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(snapshot.exported_at))}')
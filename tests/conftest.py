@@ -0,0 +1,49 @@
+import time
+from repo import *
+
+
+class MemoryDroneRepository(IDroneRepository):
+    """
+    Репозиторий в памяти для тестов индекса поиска и снимков
+    """
+    def __init__(self, rows=()):
+        self.rows = {row[0]: tuple(row) for row in rows}
+        self.before_read = None
+        self.full_reads = 0
+        self.changes = []
+
+    def get_all_drones(self):
+        self.full_reads += 1
+        rows = sorted(self.rows.values())
+        if self.before_read is not None:
+            self.before_read()
+        return rows
+
+    def get_drone_by_id(self, drone_id: int):
+        return [self.rows[drone_id]] if drone_id in self.rows else []
+
+    def add_drone(self, drone: Drone):
+        drone_id = max(self.rows, default=0) + 1
+        self.rows[drone_id] = (drone_id, drone.max_altitude, drone.max_speed, drone.max_flight_time,
+                               drone.serial_number, drone.model, drone.manufacturer)
+        return drone_id
+
+    def remove_drone(self, drone_id: int):
+        if self.rows.pop(drone_id, None) is None:
+            return False
+        self.changes.append((drone_id, time.time()))
+        return True
+
+    def update_drone(self, drone_id: int, drone: Drone):
+        if drone_id not in self.rows:
+            return False
+        self.rows[drone_id] = (drone_id, drone.max_altitude, drone.max_speed, drone.max_flight_time,
+                               drone.serial_number, drone.model, drone.manufacturer)
+        self.changes.append((drone_id, time.time()))
+        return True
+
+    def get_drones_after(self, drone_id: int):
+        return sorted(row for row in self.rows.values() if row[0] > drone_id)
+
+    def get_changes_since(self, timestamp: float):
+        return {drone_id: self.rows.get(drone_id) for drone_id, changed_at in self.changes if changed_at >= timestamp}
@@ -0,0 +1,144 @@
+import os
+import time
+from contextlib import closing
+import pytest
+from repo import *
+from snapshot import FleetSnapshot
+
+
+def _postgres_available():
+    """
+    Функция проверки доступности PostgresSql. Тесты очищают таблицу tbl_drones,
+    поэтому запускаются только при явно заданной переменной окружения BPLA_PG_HOST
+    """
+    if not os.environ.get('BPLA_PG_HOST'):
+        return False
+    try:
+        factory = PostgresSQLFactory(min_connections=1, max_connections=1)
+        factory.release(factory.connect())
+        factory.close_all()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _postgres_available(), reason='PostgresSql недоступен (BPLA_PG_HOST)')
+
+
+@pytest.fixture
+def factory():
+    factory = PostgresSQLFactory(max_connections=2, connect_timeout=0.5)
+    yield factory
+    factory.close_all()
+
+
+@pytest.fixture
+def repository(factory):
+    repository = PostgresDroneRepository(factory)
+    repository.create_table()
+    connect = factory.connect()
+    with connect.cursor() as cur_cursor:
+        cur_cursor.execute('TRUNCATE tbl_drones, tbl_drone_changes RESTART IDENTITY')
+    connect.commit()
+    factory.release(connect)
+    return repository
+
+
+def test_crud(repository):
+    drone_id = repository.add_drone(Drone(100, 50, 30, 'SN-1', 'Mavic', 'DJI'))
+    assert repository.get_drone_by_id(drone_id) == [(drone_id, 100, 50, 30, 'SN-1', 'Mavic', 'DJI')]
+
+    assert repository.update_drone(drone_id, Drone(200, 60, 40, 'SN-1', 'Mavic 3', 'DJI'))
+    assert repository.get_drone_by_id(drone_id) == [(drone_id, 200, 60, 40, 'SN-1', 'Mavic 3', 'DJI')]
+
+    assert repository.remove_drone(drone_id)
+    assert repository.get_drone_by_id(drone_id) == []
+    assert not repository.remove_drone(drone_id)
+    assert not repository.update_drone(drone_id, Drone(1, 1, 1, 'SN-1', 'm', 'f'))
+
+
+def test_add_duplicate_serial_number(repository):
+    assert repository.add_drone(Drone(1, 1, 1, 'SN-1', 'm', 'f')) is not None
+    assert repository.add_drone(Drone(1, 1, 1, 'SN-1', 'm', 'f')) is None
+    assert len(repository.get_all_drones()) == 1
+
+
+def test_iter_drones_small_batches(repository):
+    for i in range(7):
+        repository.add_drone(Drone(i, i, i, f'SN-{i}', 'm', 'f'))
+    rows = list(repository.iter_drones(batch_size=2))
+    assert [row[4] for row in rows] == [f'SN-{i}' for i in range(7)]
+    assert repository.get_all_drones() == rows
+
+
+def test_iter_drones_closed_early_releases_connection(repository, factory):
+    for i in range(3):
+        repository.add_drone(Drone(i, i, i, f'SN-{i}', 'm', 'f'))
+    for _ in range(3):
+        with closing(repository.iter_drones(batch_size=1)) as rows:
+            next(rows)
+    assert len(repository.get_all_drones()) == 3
+
+
+def test_pool_waits_then_fails(factory):
+    connections = [factory.connect(), factory.connect()]
+    with pytest.raises(pool.PoolError):
+        factory.connect()
+    factory.release(connections.pop())
+    factory.release(factory.connect())
+    factory.release(connections.pop())
+
+
+def test_bulk_load(repository):
+    drones = (Drone(i, i, i, f'SN-{i}', f'Model "{i}", v2', 'FlyCorp') for i in range(1000))
+    assert repository.bulk_load(drones) == 1000
+    rows = repository.get_all_drones()
+    assert len(rows) == 1000
+    assert rows[5][4:] == ('SN-5', 'Model "5", v2', 'FlyCorp')
+
+
+def test_bulk_load_empty_strings(repository):
+    assert repository.bulk_load([Drone(1, 2, 3, 'SN-1', '', ''), Drone(1, 2, 3, '', 'm', 'f')]) == 2
+    assert [row[4:] for row in repository.get_all_drones()] == [('SN-1', '', ''), ('', 'm', 'f')]
+
+
+def test_bulk_load_is_atomic(repository):
+    with pytest.raises(psycopg2.Error):
+        repository.bulk_load([Drone(1, 1, 1, 'SN-1', 'm', 'f'), Drone(1, 1, 1, 'SN-1', 'm', 'f')])
+    assert repository.get_all_drones() == []
+
+
+def test_changes_since(repository, tmp_path):
+    first = repository.add_drone(Drone(1, 1, 1, 'SN-1', 'm', 'f'))
+    second = repository.add_drone(Drone(1, 1, 1, 'SN-2', 'm', 'f'))
+    started = time.time()
+    assert repository.get_changes_since(0) == {}
+    assert repository.update_drone(first, Drone(2, 2, 2, 'SN-1B', 'm', 'f'))
+    assert repository.remove_drone(second)
+    assert not repository.remove_drone(second)
+    assert repository.get_changes_since(started) == {first: (first, 2, 2, 2, 'SN-1B', 'm', 'f'), second: None}
+    assert repository.get_changes_since(time.time() + 1) == {}
+
+    path = str(tmp_path / 'fleet.snap')
+    repository.export_snapshot(path)
+    with FleetSnapshot(path) as snapshot:
+        assert snapshot.exported_at <= time.time()
+        assert list(snapshot.rows()) == [(first, 2, 2, 2, 'SN-1B', 'm', 'f')]
+
+def test_release_drops_terminated_connection(factory):
+    for _ in range(3):
+        connect = factory.connect()
+        with connect.cursor() as cur_cursor:
+            cur_cursor.execute('SELECT 1')
+        killer = psycopg2.connect(**factory._params)
+        killer.autocommit = True
+        with killer.cursor() as cur_cursor:
+            cur_cursor.execute('SELECT pg_terminate_backend(%s)', (connect.get_backend_pid(),))
+        killer.close()
+        factory.release(connect)
+
+    connect = factory.connect()
+    with connect.cursor() as cur_cursor:
+        cur_cursor.execute('SELECT 1')
+        assert cur_cursor.fetchone() == (1,)
+    factory.release(connect)
@@ -0,0 +1,188 @@
+import random
+import string
+import threading
+import time
+import pytest
+from search import *
+from conftest import MemoryDroneRepository
+
+
+ROWS = [
+    (1, 100, 50, 30, 'SN-A100', 'Mavic 3', 'DJI'),
+    (2, 200, 60, 40, 'SN-A200', 'Phantom 4', 'DJI'),
+    (3, 300, 70, 50, 'XB-9000', 'Anafi', 'Parrot'),
+    (4, 400, 80, 60, 'SN-B100', 'Skydio X2', 'Skydio'),
+]
+
+
+@pytest.fixture
+def index():
+    index = DroneSearchIndex()
+    index.build(ROWS)
+    return index
+
+
+def test_prefix_search_is_case_insensitive_over_all_fields(index):
+    assert [row[0] for row in index.prefix_search('sn-a')] == [1, 2]
+    assert [row[0] for row in index.prefix_search('MAV')] == [1]
+    assert [row[0] for row in index.prefix_search('parr')] == [3]
+    assert index.prefix_search('zzz') == []
+
+
+def test_prefix_search_limit_and_dedup(index):
+    assert len(index.prefix_search('s', limit=2)) == 2
+    assert [row[0] for row in index.prefix_search('skydio')] == [4]
+
+
+def test_fuzzy_search_finds_typos(index):
+    assert index.fuzzy_search('mavik')[0][0] == 1
+    assert index.fuzzy_search('fantom')[0][0] == 2
+    assert index.fuzzy_search('qqqqq') == []
+
+
+def test_search_prefix_first_then_fuzzy(index):
+    assert index.search('   ') == []
+    assert index.search('mavik') == []
+    assert [row[0] for row in index.search('mavik', fuzzy=True)] == [1]
+
+
+def test_add_replace_remove_keep_index_in_sync(index):
+    index.add((5, 1, 1, 1, 'NEW-1', 'Mavic 3', 'DJI'))
+    assert [row[0] for row in index.prefix_search('new')] == [5]
+
+    index.add((5, 1, 1, 1, 'OLD-1', 'Matrice', 'DJI'))
+    assert index.prefix_search('new') == []
+    assert [row[0] for row in index.prefix_search('matr')] == [5]
+    assert [row[0] for row in index.prefix_search('mavic')] == [1]
+
+    index.remove(5)
+    index.remove(1)
+    assert index.prefix_search('old') == []
+    assert index.prefix_search('mavic') == []
+    assert index.fuzzy_search('mavik') == []
+    assert len(index) == 3
+
+
+def test_repository_mutations_update_index():
+    repository = SearchableDroneRepository(MemoryDroneRepository(ROWS))
+    assert [row[0] for row in repository.search('sn-')] == [1, 2, 4]
+
+    drone_id = repository.add_drone(Drone(1, 1, 1, 'SN-C100', 'Mini', 'DJI'))
+    assert [row[0] for row in repository.search('sn-c')] == [drone_id]
+
+    assert repository.update_drone(drone_id, Drone(1, 1, 1, 'ZZ-1', 'Mini', 'DJI'))
+    assert repository.search('sn-c') == []
+    assert [row[0] for row in repository.search('zz')] == [drone_id]
+
+    assert repository.remove_drone(drone_id)
+    assert repository.search('zz') == []
+
+
+def test_write_during_build_is_not_lost():
+    storage = MemoryDroneRepository(ROWS)
+    repository = SearchableDroneRepository(storage)
+    writers = []
+
+    def before_read():
+        # Хранилище уже прочитано для построения индекса, а запись приходит до его окончания
+        writer = threading.Thread(target=repository.add_drone, args=(Drone(1, 1, 1, 'LATE-1', 'Mini', 'DJI'),))
+        writer.start()
+        writers.append(writer)
+        while len(storage.rows) == len(ROWS):
+            time.sleep(0.001)
+
+    storage.before_read = before_read
+    repository.search('x')
+    storage.before_read = None
+    writers[0].join()
+    assert [row[4] for row in repository.search('late')] == ['LATE-1']
+
+
+def test_refresh_interval_picks_up_foreign_writes():
+    storage = MemoryDroneRepository(ROWS)
+    repository = SearchableDroneRepository(storage, refresh_interval=0)
+    assert repository.search('other') == []
+    storage.add_drone(Drone(1, 1, 1, 'OTHER-1', 'Mini', 'DJI'))
+    time.sleep(0.01)
+    repository.search('other')
+    assert repository.wait_refresh(5)
+    assert [row[4] for row in repository.search('other')] == ['OTHER-1']
+
+
+def test_refresh_does_not_block_search_and_writes():
+    storage = MemoryDroneRepository(ROWS)
+    repository = SearchableDroneRepository(storage, refresh_interval=0)
+    assert [row[0] for row in repository.search('sn-a')] == [1, 2]
+    reading, release = threading.Event(), threading.Event()
+
+    def slow_read():
+        reading.set()
+        release.wait(5)
+
+    storage.before_read = slow_read
+    start = time.perf_counter()
+    assert [row[0] for row in repository.search('sn-a')] == [1, 2]
+    assert reading.wait(5)
+    drone_id = repository.add_drone(Drone(1, 1, 1, 'SN-A300', 'Mini', 'DJI'))
+    assert repository.update_drone(2, Drone(1, 1, 1, 'ZZ-2', 'Mini', 'DJI'))
+    assert repository.remove_drone(3)
+    assert [row[0] for row in repository.search('sn-a')] == [1, drone_id]
+    assert time.perf_counter() - start < 0.5
+
+    storage.before_read = None
+    release.set()
+    assert repository.wait_refresh(5)
+    # Изменения, записанные во время перестроения, не потеряны в новом индексе
+    assert [row[0] for row in repository.search('sn-a')] == [1, drone_id]
+    assert [row[0] for row in repository.search('zz')] == [2]
+    assert repository.search('xb') == []
+
+
+def test_search_route(monkeypatch):
+    import server
+    monkeypatch.setattr(server, 'repository', SearchableDroneRepository(MemoryDroneRepository(ROWS)))
+    client = server.app.test_client()
+
+    response = client.get('/drones/search?q=sn-a')
+    assert response.status_code == 200
+    assert [item['id'] for item in response.get_json()] == [1, 2]
+    assert response.get_json()[0] == {'id': 1, 'max_altitude': 100, 'max_speed': 50, 'max_flight_time': 30,
+                                      'serial_number': 'SN-A100', 'model': 'Mavic 3', 'manufacturer': 'DJI'}
+
+    assert client.get('/drones/search?q=mavik').get_json() == []
+    assert [item['id'] for item in client.get('/drones/search?q=mavik&fuzzy=1').get_json()] == [1]
+    assert len(client.get('/drones/search?q=sn&limit=1').get_json()) == 1
+    assert len(client.get('/drones/search?q=sn&limit=0').get_json()) == 1
+
+
+def test_search_route_clamps_limit(monkeypatch):
+    import server
+    rows = [(i, 1, 1, 1, f'SN-{i:05}', 'm', 'f') for i in range(1, 501)]
+    monkeypatch.setattr(server, 'repository', SearchableDroneRepository(MemoryDroneRepository(rows)))
+    response = server.app.test_client().get(f'/drones/search?q=sn&limit={10 ** 9}')
+    assert len(response.get_json()) == server.SEARCH_LIMIT_MAX
+
+
+@pytest.fixture(scope='module')
+def large_index():
+    generator = random.Random(1)
+    models = [f'Model{i}' for i in range(60)] + ['Mavic 3', 'Phantom 4', 'Matrice 300', 'Skydio X2']
+    manufacturers = ['DJI', 'FlyCorp', 'Parrot', 'Autel', 'Skydio', 'Yuneec', 'AeroVironment']
+    index = DroneSearchIndex()
+    index.build((i, 1, 1, 1, 'SN' + ''.join(generator.choices(string.ascii_uppercase + string.digits, k=10)),
+                 generator.choice(models), generator.choice(manufacturers)) for i in range(1, 100001))
+    return index
+
+
+@pytest.mark.parametrize('query, fuzzy', [
+    ('sn7k', False), ('model1', False), ('dji', False),
+    ('modl12', True), ('mavik', True), ('sn7k2x', True), ('flycrop', True),
+])
+def test_typeahead_latency(large_index, query, fuzzy):
+    assert large_index.search(query, fuzzy=fuzzy)
+    timings = []
+    for _ in range(10):
+        start = time.perf_counter()
+        large_index.search(query, fuzzy=fuzzy)
+        timings.append(time.perf_counter() - start)
+    assert sorted(timings)[len(timings) // 2] < 0.02
@@ -0,0 +1,257 @@
+import os
+import random
+import shutil
+import string
+import struct
+import subprocess
+import sys
+import time
+import numpy as np
+import pytest
+from search import *
+from snapshot import *
+from conftest import MemoryDroneRepository
+
+
+ROWS = [
+    (1, 100, 50, 30, 'SN-A100', 'Mavic 3', 'DJI'),
+    (2, 200, 60, 40, 'SN-A200', 'Phantom 4', 'DJI'),
+    (5, 300, 70, 50, 'ЖУК-01', 'Анафи', 'Parrot'),
+    (9, 400, 80, 60, 'SN-B100', '', 'Skydio'),
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    path = str(tmp_path / 'fleet.snap')
+    write_snapshot(path, ROWS)
+    return path
+
+
+def test_round_trip(snapshot_path):
+    with FleetSnapshot(snapshot_path) as snapshot:
+        assert len(snapshot) == 4
+        assert list(snapshot.rows()) == ROWS
+        assert snapshot.max_id == 9
+        assert time.time() - snapshot.exported_at < 60
+        assert snapshot.columns['id'].dtype == np.dtype('<i8')
+        assert snapshot.columns['max_speed'].tolist() == [50, 60, 70, 80]
+        assert not snapshot.columns['max_speed'].flags.owndata
+
+
+def test_empty_fleet(tmp_path):
+    path = str(tmp_path / 'empty.snap')
+    assert write_snapshot(path, []) == 0
+    with FleetSnapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert list(snapshot.rows()) == []
+        assert snapshot.find(1) is None
+        assert list(snapshot.prefix_indices('model', 'a')) == []
+
+
+def test_unordered_rows_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_snapshot(str(tmp_path / 'bad.snap'), [ROWS[1], ROWS[0]])
+
+
+def test_bad_magic(snapshot_path):
+    with open(snapshot_path, 'r+b') as file:
+        file.write(b'NOTASNAP')
+    with pytest.raises(ValueError, match='не является снимком'):
+        FleetSnapshot(snapshot_path)
+
+
+def test_bad_version(snapshot_path):
+    with open(snapshot_path, 'r+b') as file:
+        file.seek(8)
+        file.write(struct.pack('<I', SNAPSHOT_VERSION + 1))
+    with pytest.raises(ValueError, match='версия'):
+        FleetSnapshot(snapshot_path)
+
+
+def test_truncated_file(snapshot_path):
+    with open(snapshot_path, 'r+b') as file:
+        file.truncate(os.path.getsize(snapshot_path) - 16)
+    with pytest.raises(ValueError, match='поврежден'):
+        FleetSnapshot(snapshot_path)
+
+
+def test_find(snapshot_path):
+    with FleetSnapshot(snapshot_path) as snapshot:
+        assert snapshot.find(5) == ROWS[2]
+        assert snapshot.find(9) == ROWS[3]
+        assert snapshot.find(3) is None
+        assert snapshot.find(0) is None
+        assert snapshot.find(100) is None
+
+
+def test_prefix_indices(snapshot_path):
+    with FleetSnapshot(snapshot_path) as snapshot:
+        assert [snapshot.row(i)[0] for i in snapshot.prefix_indices('serial_number', 'sn-a')] == [1, 2]
+        assert [snapshot.row(i)[0] for i in snapshot.prefix_indices('serial_number', 'жук')] == [5]
+        assert [snapshot.row(i)[0] for i in snapshot.prefix_indices('model', '')] == [9, 1, 2, 5]
+        assert list(snapshot.prefix_indices('manufacturer', 'zzz')) == []
+
+
+def test_close_with_held_view(snapshot_path):
+    snapshot = FleetSnapshot(snapshot_path)
+    speeds = snapshot.columns['max_speed']
+    with pytest.raises(BufferError):
+        snapshot.close()
+    assert snapshot.find(1) == ROWS[0]
+    del speeds
+    snapshot.close()
+
+
+def test_snapshot_index_serves_search_from_mmap(snapshot_path):
+    index = SnapshotSearchIndex(FleetSnapshot(snapshot_path))
+    try:
+        assert [row[0] for row in index.prefix_search('sn-')] == [1, 2, 9]
+        assert [row[0] for row in index.search('dji')] == [1, 2]
+        assert index.fuzzy_search('mavik')[0] == ROWS[0]
+        assert len(index) == 4 and 5 in index and 3 not in index
+    finally:
+        index.close()
+
+
+def test_snapshot_index_overlay(snapshot_path):
+    index = SnapshotSearchIndex(FleetSnapshot(snapshot_path))
+    try:
+        index.add((1, 1, 1, 1, 'NEW-1', 'Matrice', 'DJI'))
+        index.add((10, 1, 1, 1, 'SN-C100', 'Mini', 'DJI'))
+        index.remove(2)
+        assert [row[0] for row in index.prefix_search('sn-')] == [10, 9]
+        assert index.prefix_search('new') == [(1, 1, 1, 1, 'NEW-1', 'Matrice', 'DJI')]
+        assert index.prefix_search('mavic') == []
+        assert index.fuzzy_search('fantom') == []
+        assert len(index) == 4 and 2 not in index and 10 in index
+        index.remove(10)
+        assert 10 not in index
+    finally:
+        index.close()
+
+
+def test_repository_warm_start_catches_up(snapshot_path):
+    storage = MemoryDroneRepository(ROWS)
+    storage.add_drone(Drone(1, 1, 1, 'SN-LATE', 'Mini', 'DJI'))
+    repository = SearchableDroneRepository(storage, snapshot_path=snapshot_path, snapshot_max_age=60)
+    assert [row[4] for row in repository.search('sn-')] == ['SN-LATE', 'SN-A100', 'SN-A200', 'SN-B100']
+    assert storage.full_reads == 0
+
+    assert repository.remove_drone(1)
+    drone_id = repository.add_drone(Drone(1, 1, 1, 'SN-NEW', 'Mini', 'DJI'))
+    assert repository.update_drone(2, Drone(1, 1, 1, 'XX-2', 'Mini', 'DJI'))
+    assert [row[4] for row in repository.search('sn-')] == ['SN-LATE', 'SN-NEW', 'SN-B100']
+    assert [row[0] for row in repository.search('xx')] == [2]
+    assert drone_id == 11
+
+
+def test_repository_refuses_stale_snapshot(snapshot_path):
+    storage = MemoryDroneRepository(ROWS[:1])
+    repository = SearchableDroneRepository(storage, snapshot_path=snapshot_path, snapshot_max_age=0)
+    time.sleep(0.01)
+    assert [row[0] for row in repository.search('sn-')] == [1]
+    assert storage.full_reads == 1
+
+
+def test_repository_ignores_broken_snapshot(tmp_path):
+    path = tmp_path / 'broken.snap'
+    path.write_bytes(b'garbage')
+    storage = MemoryDroneRepository(ROWS)
+    repository = SearchableDroneRepository(storage, snapshot_path=str(path))
+    assert [row[0] for row in repository.search('sn-a')] == [1, 2]
+    assert storage.full_reads == 1
+
+
+def test_cli_export_and_info(tmp_path):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    shutil.copy(os.path.join(root, 'bpla.db'), tmp_path / 'bpla.db')
+    env = dict(os.environ, PYTHONPATH=root)
+    script = os.path.join(root, 'snapshot.py')
+    subprocess.run([sys.executable, script, 'export', 'fleet.snap'], cwd=tmp_path, env=env, check=True)
+    info = subprocess.run([sys.executable, script, 'info', 'fleet.snap'], cwd=tmp_path, env=env, check=True,
+                          capture_output=True, text=True)
+    with FleetSnapshot(str(tmp_path / 'fleet.snap')) as snapshot:
+        assert f'Дронов: {len(snapshot)}' in info.stdout
+        assert list(snapshot.rows()) == sorted(SqliteDroneRepository().get_all_drones())
+
+
+def test_repository_warm_start_applies_changes_after_export(snapshot_path):
+    storage = MemoryDroneRepository(ROWS)
+    assert storage.update_drone(2, Drone(1, 1, 1, 'XX-2', 'Mini', 'DJI'))
+    assert storage.remove_drone(1)
+    repository = SearchableDroneRepository(storage, snapshot_path=snapshot_path, snapshot_max_age=60)
+    assert [row[4] for row in repository.search('sn-')] == ['SN-B100']
+    assert [row[0] for row in repository.search('xx')] == [2]
+    assert repository.search('mavik', fuzzy=True) == []
+    assert storage.full_reads == 0
+
+
+def test_repository_without_change_log_ignores_snapshot(snapshot_path):
+    class UntrackedRepository(MemoryDroneRepository):
+        def get_changes_since(self, timestamp: float):
+            return None
+
+    storage = UntrackedRepository(ROWS)
+    repository = SearchableDroneRepository(storage, snapshot_path=snapshot_path)
+    assert [row[0] for row in repository.search('sn-a')] == [1, 2]
+    assert storage.full_reads == 1
+
+
+def test_repository_refresh_reopens_newer_snapshot(snapshot_path):
+    storage = MemoryDroneRepository(ROWS)
+    repository = SearchableDroneRepository(storage, snapshot_path=snapshot_path, refresh_interval=0,
+                                           snapshot_max_age=60)
+    assert [row[0] for row in repository.search('sn-a')] == [1, 2]
+    storage.add_drone(Drone(1, 1, 1, 'SN-A300', 'Mini', 'DJI'))
+    storage.export_snapshot(snapshot_path)
+    storage.remove_drone(2)
+    reads = storage.full_reads
+
+    repository.search('sn-a')
+    assert repository.wait_refresh(5)
+    assert [row[0] for row in repository.search('sn-a')] == [1, 10]
+    assert storage.full_reads == reads
+
+
+def test_failed_export_leaves_no_temp_file(snapshot_path):
+    directory = os.path.dirname(snapshot_path)
+    with pytest.raises(ValueError):
+        write_snapshot(snapshot_path, [ROWS[1], ROWS[0]])
+    assert os.listdir(directory) == ['fleet.snap']
+    with FleetSnapshot(snapshot_path) as snapshot:
+        assert list(snapshot.rows()) == ROWS
+
+
+def test_snapshot_fuzzy_search_matches_memory_index(tmp_path):
+    generator = random.Random(2)
+    models = ['Mavic 3', 'Phantom 4', 'Matrice 300', 'Skydio X2', 'Анафи'] + [f'Model{i}' for i in range(40)]
+    rows = [(i, 1, 1, 1, 'SN' + ''.join(generator.choices(string.ascii_uppercase + string.digits, k=8)),
+             generator.choice(models), generator.choice(['DJI', 'Parrot', 'FlyCorp'])) for i in range(1, 5001)]
+    path = str(tmp_path / 'fleet.snap')
+    write_snapshot(path, rows)
+    memory = DroneSearchIndex()
+    memory.build(rows)
+    index = SnapshotSearchIndex(FleetSnapshot(path))
+    try:
+        for query in ['mavik', 'fantom', 'modl12', 'flycrop', 'sn7k', 'sn' + rows[100][4][2:6].lower(),
+                      'анафм', 'qqqq', 'x']:
+            assert index.fuzzy_search(query) == memory.fuzzy_search(query)
+    finally:
+        index.close()
+
+
+def test_sqlite_change_log_catch_up(tmp_path, monkeypatch):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    shutil.copy(os.path.join(root, 'bpla.db'), tmp_path / 'bpla.db')
+    monkeypatch.chdir(tmp_path)
+    storage = SqliteDroneRepository()
+    first = storage.add_drone(Drone(1, 1, 1, 'CHG-1', 'Mini', 'DJI'))
+    second = storage.add_drone(Drone(1, 1, 1, 'CHG-2', 'Mini', 'DJI'))
+    storage.export_snapshot('fleet.snap')
+    assert storage.update_drone(first, Drone(1, 1, 1, 'CHG-1B', 'Mini', 'DJI'))
+    assert storage.remove_drone(second)
+    assert storage.get_changes_since(0) == {first: (first, 1, 1, 1, 'CHG-1B', 'Mini', 'DJI'), second: None}
+
+    repository = SearchableDroneRepository(storage, snapshot_path='fleet.snap', snapshot_max_age=60)
+    assert [row[4] for row in repository.search('chg-')] == ['CHG-1B']
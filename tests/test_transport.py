@@ -0,0 +1,131 @@
+import socket
+import pytest
+import mission
+from mission import *
+from simulator import *
+
+
+@pytest.fixture
+def simulator():
+    with DroneSimulator(port=0) as simulator:
+        yield simulator
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def send_fleet(transport, drones: int, commands: int):
+    controllers = [DroneController(transport, drone_id) for drone_id in range(drones)]
+    for controller in controllers:
+        controller.takeoff()
+    for step in range(commands):
+        for controller in controllers:
+            if step % 2:
+                controller.turn(15)
+            else:
+                controller.move_forward(10)
+    return controllers
+
+
+@pytest.fixture(autouse=True)
+def mission_page(tmp_path, monkeypatch):
+    path = tmp_path / 'mission.html'
+    monkeypatch.setattr(mission, 'PATH', str(path))
+    return path
+
+
+def test_fleet_commands_are_pipelined_and_acked(simulator):
+    transport = UdpDroneTransport(simulator.address, window=512)
+    try:
+        controllers = send_fleet(transport, drones=300, commands=20)
+        for controller in controllers:
+            assert controller.flush(timeout=30) == []
+        assert transport.pending() == 0
+    finally:
+        transport.close()
+
+
+def test_lossy_network_is_recovered_by_retransmission():
+    with DroneSimulator(port=0, loss_rate=0.1) as simulator:
+        transport = UdpDroneTransport(simulator.address, retry_timeout=0.05, max_retries=20)
+        try:
+            controllers = send_fleet(transport, drones=50, commands=10)
+            for controller in controllers:
+                assert controller.flush(timeout=30) == []
+        finally:
+            transport.close()
+
+
+def test_expired_command_fails_and_resyncs_drone():
+    port = free_port()
+    transport = UdpDroneTransport(('127.0.0.1', port), retry_timeout=0.05, max_retries=2)
+    try:
+        controller = DroneController(transport, drone_id=7)
+        futures = [controller.takeoff(), controller.move_forward(10), controller.turn(90)]
+        failures = controller.flush(timeout=transport.timeout * 4)
+        assert sorted(failures, key=futures.index) == futures
+        assert all(isinstance(future.exception(), TimeoutError) for future in futures)
+
+        # Нумерация дрона начинается заново, и новые команды не ждут потерянные
+        with DroneSimulator(port=port):
+            controller.takeoff()
+            controller.move_forward(10)
+            assert controller.flush(timeout=10) == []
+    finally:
+        transport.close()
+
+
+def test_new_session_does_not_get_cached_status(simulator):
+    first = UdpDroneTransport(simulator.address)
+    with pytest.raises(RuntimeError):
+        first.send(1, OPCODE_MOVE_FORWARD, 10).result(timeout=10)
+    first.close()
+
+    second = UdpDroneTransport(simulator.address)
+    try:
+        assert second.send(1, OPCODE_TAKEOFF).result(timeout=10) == 1
+    finally:
+        second.close()
+
+
+def test_simulated_drone_resets_on_new_epoch_and_drops_stale():
+    drone = SimulatedDrone(1)
+    assert drone.receive(5, 0, 1, OPCODE_TAKEOFF, 0) == [(1, STATUS_OK)]
+    assert drone.receive(5, 0, 3, OPCODE_TURN, 90) == []
+    assert drone.receive(5, 1, 1, OPCODE_TURN, 90) == [(1, STATUS_OK)]
+    assert drone.receive(5, 0, 2, OPCODE_TURN, 90) == []
+    assert drone.receive(6, 0, 1, OPCODE_MOVE_FORWARD, 1) == [(1, STATUS_OK)]
+    assert drone.heading == 90
+
+
+def test_strategy_reports_unacknowledged_commands(mission_page):
+    transport = UdpDroneTransport(('127.0.0.1', free_port()), retry_timeout=0.05, max_retries=1)
+    try:
+        controller = DroneController(transport)
+        context = DroneContext(ReconMissionStrategy())
+        context.add_command(Takeoff(controller))
+        context.add_command(MoveForward(controller, 100))
+        assert len(context.execute()) == 2
+        assert mission_page.read_text(encoding='utf-8').count('Команда не выполнена') == 2
+        assert len(controller.flush(timeout=0)) == 2
+        assert controller.flush(timeout=0) == []
+    finally:
+        transport.close()
+
+
+def test_strategy_waits_for_acknowledgements(simulator, mission_page):
+    transport = UdpDroneTransport(simulator.address)
+    try:
+        controller = DroneController(transport)
+        context = DroneContext(PatrolMissionStrategy(n_patrols=3))
+        context.add_command(Takeoff(controller))
+        context.add_command(MoveForward(controller, 50))
+        context.add_command(Turn(controller, 90))
+        assert context.execute() == []
+        assert controller.flush(timeout=0) == []
+        assert 'не выполнена' not in mission_page.read_text(encoding='utf-8')
+    finally:
+        transport.close()
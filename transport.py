@@ -0,0 +1,210 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+import logging
+import secrets
+import socket
+import struct
+import threading
+import time
+
+
+PROTOCOL_MAGIC = 0xB17B
+# magic, сессия транспорта, эпоха дрона, id дрона, порядковый номер команды, код команды, аргумент команды.
+# Сессия случайна для каждого экземпляра транспорта, эпоха увеличивается после потери команды;
+# при смене сессии или эпохи дрон сбрасывает нумерацию команд и начинает ее заново с 1
+COMMAND_PACKET = struct.Struct('<HIIIIBd')
+# magic, сессия транспорта, эпоха дрона, id дрона, порядковый номер подтверждаемой команды, статус
+ACK_PACKET = struct.Struct('<HIIIIB')
+
+OPCODE_TAKEOFF = 1
+OPCODE_MOVE_FORWARD = 2
+OPCODE_TURN = 3
+
+STATUS_OK = 0
+STATUS_REJECTED = 1
+
+
+class IDroneTransport(ABC):
+    """
+    Интерфейс транспорта для отправки команд дронам
+    """
+    @abstractmethod
+    def send(self, drone_id: int, opcode: int, argument: float = 0.0):
+        """
+        Абстрактный метод отправки команды дрону без ожидания подтверждения
+        :param drone_id: id дрона
+        :param opcode: Код команды
+        :param argument: Аргумент команды (расстояние, угол)
+        :return: Future, завершающийся при подтверждении команды дроном
+        """
+        pass
+
+    @abstractmethod
+    def close(self):
+        """
+        Абстрактный метод закрытия транспорта
+        """
+        pass
+
+
+class UdpDroneTransport(IDroneTransport):
+    """
+    Реализация транспорта команд по UDP с конвейерной отправкой.
+    Каждая команда получает порядковый номер дрона, одновременно в полете может находиться
+    до window неподтвержденных команд; подтверждения принимаются асинхронно отдельным потоком,
+    неподтвержденные команды переотправляются по таймауту.
+    Если команда не подтверждена после max_retries переотправок, она и все следующие за ней
+    неподтвержденные команды того же дрона завершаются с ошибкой, а нумерация команд дрона
+    начинается заново в новой эпохе, чтобы дрон не ждал потерянную команду.
+    Одним дроном в каждый момент должен управлять один экземпляр транспорта
+    """
+    def __init__(self, address, window: int = 256, retry_timeout: float = 0.2, max_retries: int = 5):
+        """
+        Конструктор класса UdpDroneTransport
+        :param address: Адрес (host, port) шлюза или симулятора дронов
+        :param window: Максимальное количество неподтвержденных команд
+        :param retry_timeout: Время ожидания подтверждения до переотправки, в секундах
+        :param max_retries: Количество переотправок, после которого команда считается неуспешной
+        """
+        self._address = address
+        self._retry_timeout = retry_timeout
+        self._max_retries = max_retries
+        self._session = secrets.randbits(32)
+        self._window = threading.BoundedSemaphore(window)
+        self._epochs = {}
+        self._sequences = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.settimeout(retry_timeout / 2)
+        self._receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self._retransmitter = threading.Thread(target=self._retransmit_loop, daemon=True)
+        self._receiver.start()
+        self._retransmitter.start()
+
+    @property
+    def timeout(self):
+        """
+        Максимальное время от отправки команды до ее подтверждения или отказа, в секундах
+        """
+        return self._retry_timeout * (self._max_retries + 2)
+
+    def send(self, drone_id: int, opcode: int, argument: float = 0.0):
+        """
+        Метод отправки команды дрону без ожидания подтверждения
+        :param drone_id: id дрона
+        :param opcode: Код команды
+        :param argument: Аргумент команды (расстояние, угол)
+        :return: Future, завершающийся при подтверждении команды дроном
+        """
+        logging.info('Запуск метода send для UdpDroneTransport')
+        if self._closed.is_set():
+            raise RuntimeError('Транспорт закрыт')
+        self._window.acquire()
+        future = Future()
+        with self._lock:
+            epoch = self._epochs.setdefault(drone_id, 0)
+            sequence = self._sequences.get(drone_id, 0) + 1
+            self._sequences[drone_id] = sequence
+            packet = COMMAND_PACKET.pack(PROTOCOL_MAGIC, self._session, epoch, drone_id, sequence, opcode, argument)
+            self._in_flight[(drone_id, epoch, sequence)] = [packet, time.monotonic() + self._retry_timeout, 0, future]
+        self._send_packet(packet)
+        return future
+
+    def _send_packet(self, packet):
+        """
+        Метод отправки пакета. Ошибки сети не прерывают работу: команда будет переотправлена по таймауту
+        :param packet: Пакет команды
+        """
+        try:
+            self._socket.sendto(packet, self._address)
+        except OSError as e:
+            logging.warning(f'Ошибка отправки команды: {e}')
+
+    def _complete(self, key, status=None, error=None):
+        """
+        Метод завершения команды: снимает ее из списка ожидающих и освобождает место в окне
+        :param key: Тройка (id дрона, эпоха, порядковый номер)
+        :param status: Статус из подтверждения дрона
+        :param error: Исключение, если команда не была подтверждена
+        """
+        with self._lock:
+            entry = self._in_flight.pop(key, None)
+        if entry is None:
+            return
+        self._window.release()
+        if error is not None:
+            entry[3].set_exception(error)
+        elif status != STATUS_OK:
+            entry[3].set_exception(RuntimeError(f'Дрон {key[0]} отклонил команду {key[2]}'))
+        else:
+            entry[3].set_result(key[2])
+
+    def _receive_loop(self):
+        """
+        Метод приема подтверждений в отдельном потоке
+        """
+        while not self._closed.is_set():
+            try:
+                data, _ = self._socket.recvfrom(ACK_PACKET.size)
+            except (socket.timeout, ConnectionRefusedError):
+                continue
+            except OSError:
+                break
+            if len(data) != ACK_PACKET.size:
+                continue
+            magic, session, epoch, drone_id, sequence, status = ACK_PACKET.unpack(data)
+            if magic == PROTOCOL_MAGIC and session == self._session:
+                self._complete((drone_id, epoch, sequence), status=status)
+
+    def _retransmit_loop(self):
+        """
+        Метод переотправки неподтвержденных команд в отдельном потоке
+        """
+        while not self._closed.wait(self._retry_timeout / 4):
+            now = time.monotonic()
+            resend, expired = [], {}
+            with self._lock:
+                for key, entry in self._in_flight.items():
+                    if entry[1] > now:
+                        continue
+                    if entry[2] >= self._max_retries:
+                        drone_id, epoch, sequence = key
+                        expired[(drone_id, epoch)] = min(sequence, expired.get((drone_id, epoch), sequence))
+                    else:
+                        entry[1] = now + self._retry_timeout
+                        entry[2] += 1
+                        resend.append(entry[0])
+                failed = [key for key in self._in_flight
+                          if key[:2] in expired and key[2] >= expired[key[:2]]]
+                for drone_id, epoch in expired:
+                    if self._epochs[drone_id] == epoch:
+                        self._epochs[drone_id] = epoch + 1
+                        self._sequences[drone_id] = 0
+            for packet in resend:
+                self._send_packet(packet)
+            for key in failed:
+                self._complete(key, error=TimeoutError(f'Дрон {key[0]} не подтвердил команду {key[2]}'))
+
+    def pending(self):
+        """
+        Метод получения количества неподтвержденных команд
+        :return: Количество команд в полете
+        """
+        with self._lock:
+            return len(self._in_flight)
+
+    def close(self):
+        """
+        Метод закрытия транспорта: неподтвержденные команды завершаются с ошибкой
+        """
+        logging.info('Запуск метода close для UdpDroneTransport')
+        self._closed.set()
+        self._receiver.join()
+        self._retransmitter.join()
+        self._socket.close()
+        with self._lock:
+            keys = list(self._in_flight)
+        for key in keys:
+            self._complete(key, error=ConnectionAbortedError('Транспорт закрыт'))